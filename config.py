@@ -2,52 +2,212 @@
 """配置管理模块"""
 
 from pathlib import Path
+import os
 import json
-import copy
+import mmap
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from types import MappingProxyType
 from typing import Optional
+from functools import lru_cache
 from datetime import datetime
 from astrbot.api import logger
+from .utils.jsonio import orjson, json_loads, json_dumps_bytes
+
+
+_SENTINEL = object()
+
+_WEEKDAY_LABELS = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+
+@lru_cache(maxsize=128)
+def _split_key(key: str) -> tuple:
+    """缓存点分键的拆分结果"""
+    return tuple(key.split('.'))
+
+
+_MMAP_THRESHOLD = 64 * 1024  # 超过该大小的文件改用 mmap 解析，避免整文件复制到堆上
+
+
+def _load_json_file(path: Path):
+    """读取并解析 JSON 文件（大文件 + orjson 时走 mmap 只读映射）"""
+    if orjson and path.stat().st_size > _MMAP_THRESHOLD:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+    # 小文件直接整体读取，mmap 系统调用开销反而更大
+    return json_loads(path.read_bytes())
+
+
+# 默认配置模板（模块级常量，只构建一次；用只读映射封装，防止被意外别名修改）
+# 可变容器（target_groups / exchange_time）在 _get_default_config() 中每次新建
+_DEFAULT_EXCHANGE_TIME = MappingProxyType({
+    "weekday": None,
+    "hour": None
+})
+
+_DEFAULT_CONFIG_TEMPLATE = MappingProxyType({
+    "admin_qq": "",
+    "target_groups": (),
+    "trigger_keyword": "海梦酱你好鸭",
+    "exchange_time": _DEFAULT_EXCHANGE_TIME,
+    "enabled": True,
+    "test_mode": False,
+    "rate_limit_hours": 1,      # 预留：限流时间窗口（小时），待接入
+    "spam_threshold": 5,         # 预留：刷屏阈值，待接入
+    "stock_alert_threshold": 10,
+    "skip_group_check": False,
+    "session_timeout": 300,
+})
+
+
+class Settings:
+    """配置派生快照（__slots__ 属性访问，代替热路径上的 dict.get 链）
+    
+    由 ConfigManager 在加载/set 后从配置字典构建，构建后视为只读；
+    ConfigManager 仍以嵌套字典作为 JSON 持久化的源数据。
+    """
+    
+    __slots__ = (
+        "admin_qq", "enabled", "test_mode", "trigger_keyword",
+        "target_groups", "target_groups_set", "skip_group_check",
+        "exchange_time", "exchange_time_str",
+        "flat",
+    )
+    
+    def __init__(self, admin_qq: str, enabled: bool, test_mode: bool, trigger_keyword: str,
+                 target_groups: tuple, exchange_time: Optional[tuple], exchange_time_str: str,
+                 skip_group_check: bool = False):
+        self.admin_qq = admin_qq
+        self.enabled = enabled
+        self.test_mode = test_mode
+        self.trigger_keyword = trigger_keyword
+        self.target_groups = target_groups
+        self.target_groups_set = frozenset(target_groups)
+        self.skip_group_check = skip_group_check
+        self.exchange_time = exchange_time          # (weekday, hour) 或 None
+        self.exchange_time_str = exchange_time_str
+        self.flat = {}                              # 点分键 -> 值 的扁平访问表
+    
+    @classmethod
+    def from_config(cls, cfg: dict) -> "Settings":
+        """从配置字典构建（含字段规范化）"""
+        groups = cfg.get("target_groups", [])
+        exchange_time = cls._parse_exchange_time(cfg)
+        settings = cls(
+            admin_qq=str(cfg.get("admin_qq", "")),
+            enabled=cfg.get("enabled", True),
+            test_mode=cfg.get("test_mode", False),
+            trigger_keyword=cfg.get("trigger_keyword", "海梦酱你好鸭"),
+            target_groups=tuple(str(g) for g in groups) if isinstance(groups, list) else (),
+            exchange_time=exchange_time,
+            exchange_time_str=cls._format_exchange_time(cfg, exchange_time),
+            skip_group_check=bool(cfg.get("skip_group_check", False)),
+        )
+        settings.flat = cls._flatten(cfg)
+        return settings
+    
+    @staticmethod
+    def _flatten(cfg: dict) -> dict:
+        """把嵌套配置展开为点分键表（中间层字典本身也保留在表中）"""
+        flat = {}
+        stack = [("", cfg)]
+        while stack:
+            prefix, node = stack.pop()
+            for k, v in node.items():
+                path = prefix + k
+                flat[path] = v
+                if isinstance(v, dict):
+                    stack.append((path + ".", v))
+        return flat
+    
+    @staticmethod
+    def _parse_exchange_time(cfg: dict) -> Optional[tuple]:
+        """解析并校验发放时间，返回 (weekday, hour)；未设置或非法时返回 None"""
+        exchange_time = cfg.get("exchange_time", {})
+        if not isinstance(exchange_time, dict):
+            return None
+        weekday = exchange_time.get("weekday")
+        hour = exchange_time.get("hour")
+        
+        if weekday is None or hour is None:
+            return None
+        
+        # 校验合法性
+        try:
+            weekday = int(weekday)
+            hour = int(hour)
+            if not (0 <= weekday <= 6) or not (0 <= hour <= 23):
+                return None
+        except (ValueError, TypeError):
+            return None
+        return (weekday, hour)
+    
+    @staticmethod
+    def _format_exchange_time(cfg: dict, et: Optional[tuple]) -> str:
+        """生成发放时间展示字符串"""
+        if et is not None:
+            return f"每{_WEEKDAY_LABELS[et[0]]} {et[1]}:00 - 24:00"
+        exchange_time = cfg.get("exchange_time", {})
+        if not isinstance(exchange_time, dict):
+            return "配置异常，请重新设置"
+        if exchange_time.get("weekday") is None or exchange_time.get("hour") is None:
+            return "暂未设置"
+        return "配置异常，请重新设置"
 
 
 class ConfigManager:
     """配置管理器"""
     
+    SAVE_DELAY = 0.5  # 防抖保存延迟（秒），窗口内的多次 set 合并为一次写盘
+    JOURNAL_COMPACT_LINES = 50  # 日志累计行数达到该值后触发压缩（全量重写 config.json）
+    
     @staticmethod
     def _get_default_config() -> dict:
-        """获取默认配置（每次返回新副本）"""
+        """获取默认配置（每次返回新副本，仅浅拷贝模板）
+        
+        返回的树归调用方所有：顶层与嵌套容器均为新对象，只共享不可变标量，
+        因此 _deep_merge 可以直接原地写入。
+        """
         return {
-            "admin_qq": "",
+            **_DEFAULT_CONFIG_TEMPLATE,
             "target_groups": [],
-            "trigger_keyword": "海梦酱你好鸭",
-            "exchange_time": {
-                "weekday": None,
-                "hour": None
-            },
-            "enabled": True,
-            "test_mode": False,
-            "rate_limit_hours": 1,      # 预留：限流时间窗口（小时），待接入
-            "spam_threshold": 5,         # 预留：刷屏阈值，待接入
-            "stock_alert_threshold": 10,
-            "skip_group_check": False,
-            "session_timeout": 300,
+            "exchange_time": dict(_DEFAULT_EXCHANGE_TIME),
         }
     
     def __init__(self, plugin_dir: Path):
-        import threading
         self._lock = threading.RLock()
+        self._dirty = False
+        self._flush_timer = None
         self.config_file = plugin_dir / "config.json"
+        self.journal_file = plugin_dir / "config.journal.jsonl"
+        self._journal_lines = 0
+        self.version = 0  # 配置版本号：每次重建 Settings 递增，供上层按版本缓存渲染结果
         self.config = self._load()
+        replayed = self._replay_journal()
+        self._recompute_derived()
+        if replayed:
+            # 启动时把日志合并进主文件
+            self._dirty = True
+            self._flush()
+    
+    def _recompute_derived(self):
+        """根据当前快照重建 Settings（加载后及每次 set 后调用，整体替换保证读者一致）"""
+        self.settings = Settings.from_config(self.config)
+        self.version += 1
     
     def _load(self) -> dict:
         """加载配置（带备份自动恢复）"""
-        from pathlib import Path
         backup_file = Path(str(self.config_file) + '.bak')
         
         # 尝试加载主文件
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
+                # 整体读取字节后一次性解析，避免文本流逐块解码
+                loaded = _load_json_file(self.config_file)
                 return self._deep_merge(self._get_default_config(), loaded)
             except json.JSONDecodeError as e:
                 logger.error(f"[海梦酱] 配置文件格式错误: {e}，尝试从备份恢复...")
@@ -57,13 +217,11 @@ class ConfigManager:
         # 尝试从备份恢复
         if backup_file.exists():
             try:
-                with open(backup_file, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
+                loaded = _load_json_file(backup_file)
                 
                 # 恢复成功，修复主文件
                 logger.warning("[海梦酱] ⚠️ 配置从备份恢复成功！")
                 try:
-                    import shutil
                     shutil.copy2(backup_file, self.config_file)
                     logger.info("[海梦酱] ✅ 配置主文件已从备份恢复")
                 except Exception as e:
@@ -76,43 +234,61 @@ class ConfigManager:
         return self._get_default_config()
     
     def _deep_merge(self, default: dict, loaded: dict) -> dict:
-        """深度合并配置（使用深拷贝）"""
-        result = copy.deepcopy(default)
+        """深度合并配置（原地合并到 default）
+        
+        default 来自 _get_default_config() 的新副本，loaded 来自刚解析的 JSON，
+        两者都不与其他对象共享引用，因此无需深拷贝。
+        """
         for key, value in loaded.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = self._deep_merge(result[key], value)
+            if isinstance(default.get(key), dict) and isinstance(value, dict):
+                self._deep_merge(default[key], value)
             else:
-                result[key] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
-        return result
+                default[key] = value
+        return default
     
     def save(self):
         """保存配置（原子写入）"""
-        import tempfile
-        import os
+        # 序列化并计算摘要（写入后回读校验）
+        payload = json_dumps_bytes(self.config, indent=True)
+        digest = hashlib.sha256(payload).hexdigest()
         
-        # 写入临时文件
+        # 写入临时文件（mkstemp 以 O_EXCL、0o600 创建）
         dir_path = self.config_file.parent
         fd, temp_path = tempfile.mkstemp(dir=dir_path, prefix='config_', suffix='.tmp')
         try:
-            with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            # 回读校验，发现损坏则放弃替换，保留上一份完好的配置
+            with open(temp_path, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != digest:
+                    raise OSError(f"配置临时文件校验失败（sha256 不一致）: {temp_path}")
             
             if os.name == 'nt':  # Windows 备份策略
                 backup_path = str(self.config_file) + '.bak'
                 if self.config_file.exists():
                     try:
-                        if os.path.exists(backup_path):
-                            os.remove(backup_path)
-                        os.rename(self.config_file, backup_path)
+                        # os.replace 直接覆盖旧备份，无需先删除（避免备份缺失窗口）
+                        os.replace(self.config_file, backup_path)
                     except OSError as e:
                         logger.warning(f"[海梦酱] 配置备份失败: {e}")
                 
-                os.rename(temp_path, self.config_file)
+                os.replace(temp_path, self.config_file)
                 
                 # 注意：不删除备份文件，_load() 依赖 .bak 做异常恢复
             else:  # Unix
                 os.replace(temp_path, self.config_file)
-                
+                # fsync 父目录，确保 rename 本身落盘（防止崩溃后丢失重命名）
+                if hasattr(os, 'O_DIRECTORY'):
+                    dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+                    try:
+                        os.fsync(dir_fd)
+                    finally:
+                        os.close(dir_fd)
+            
+            logger.debug(f"[海梦酱] 配置已保存 sha256={digest}")
         except Exception as e:
             logger.error(f"[海梦酱] 保存配置失败: {e}")
             try:
@@ -123,94 +299,157 @@ class ConfigManager:
             raise
     
     def get(self, key: str, default=None):
-        """获取配置项（线程安全）"""
+        """获取配置项（无锁读取当前快照，点分键查扁平表一次完成）"""
+        value = self.settings.flat.get(key, _SENTINEL)
+        return default if value is _SENTINEL else value
+    
+    @staticmethod
+    def _copy_with(node, keys: tuple, value) -> dict:
+        """沿路径复制字典并写入新值（写时复制，不修改原快照）"""
+        new = dict(node) if isinstance(node, dict) else {}
+        if len(keys) == 1:
+            new[keys[0]] = value
+        else:
+            new[keys[0]] = ConfigManager._copy_with(new.get(keys[0]), keys[1:], value)
+        return new
+    
+    @staticmethod
+    def _journal_digest(key: str, value) -> str:
+        """计算日志记录摘要（固定使用标准库规范化序列化，保证跨环境一致）"""
+        canonical = json.dumps([key, value], sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def _append_journal(self, key: str, value):
+        """追加一条修改记录到日志（O(修改量)，代替每次全量重写）"""
+        record = {"ts": time.time(), "key": key, "value": value,
+                  "sha256": self._journal_digest(key, value)}
+        line = json_dumps_bytes(record)
+        with open(self.journal_file, 'ab') as f:
+            f.write(line + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_lines += 1
+    
+    def _replay_journal(self) -> int:
+        """启动时按顺序重放日志，返回成功应用的条数（校验失败/残缺行跳过）"""
+        if not self.journal_file.exists():
+            return 0
+        replayed = 0
+        try:
+            data = self.journal_file.read_bytes()
+        except OSError as e:
+            logger.error(f"[海梦酱] 读取配置日志失败: {e}")
+            return 0
+        for raw in data.splitlines():
+            if not raw.strip():
+                continue
+            try:
+                record = json_loads(raw)
+                key, value = record["key"], record["value"]
+                if record.get("sha256") != self._journal_digest(key, value):
+                    logger.warning("[海梦酱] 配置日志记录校验失败，已跳过")
+                    continue
+            except Exception:
+                # 崩溃时可能留下半行，忽略
+                logger.warning("[海梦酱] 配置日志存在残缺记录，已跳过")
+                continue
+            self.config = self._copy_with(self.config, _split_key(key), value)
+            replayed += 1
+        if replayed:
+            logger.info(f"[海梦酱] 已从配置日志重放 {replayed} 条修改")
+        return replayed
+    
+    def _truncate_journal(self):
+        """压缩完成后清空日志"""
+        if not self.journal_file.exists():
+            return
+        with open(self.journal_file, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_lines = 0
+    
+    def set(self, key: str, value, immediate: bool = False):
+        """设置配置项（写者加锁串行，构建新快照后整体替换）
+        
+        修改先追加到日志（立即持久），日志累计到阈值后再压缩重写主文件；
+        immediate=True 时立即压缩。
+        """
         with self._lock:
-            keys = key.split('.')
-            value = self.config
-            for k in keys:
-                if isinstance(value, dict) and k in value:
-                    value = value[k]
-                else:
-                    return default
-            return value
-    
-    def set(self, key: str, value):
-        """设置配置项（线程安全）"""
+            # 值未变化（含类型）则直接返回，省去日志写入与后续落盘
+            current = self.get(key, _SENTINEL)
+            if current is not _SENTINEL and type(current) is type(value) and current == value:
+                return
+            self.config = self._copy_with(self.config, _split_key(key), value)
+            self._recompute_derived()
+            self._dirty = True
+            try:
+                self._append_journal(key, value)
+            except Exception as e:
+                logger.error(f"[海梦酱] 写入配置日志失败: {e}，改为立即保存")
+                immediate = True
+            if immediate:
+                self._flush()
+            elif self._journal_lines >= self.JOURNAL_COMPACT_LINES and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.SAVE_DELAY, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _flush(self):
+        """压缩：若有未落盘的修改则全量保存并清空日志（定时器回调 / flush / immediate 共用）"""
         with self._lock:
-            keys = key.split('.')
-            config = self.config
-            for k in keys[:-1]:
-                if k not in config:
-                    config[k] = {}
-                config = config[k]
-            config[keys[-1]] = value
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
             self.save()
+            self._dirty = False
+            # 先写主文件再清日志：两步之间崩溃只会导致重复重放（set 语义幂等）
+            self._truncate_journal()
+    
+    def flush(self):
+        """立即写出待保存的配置（插件卸载时调用）"""
+        self._flush()
+    
+    # 以下读取方法均不加锁：读取当前 Settings 快照的槽属性
+    # （属性读取在 GIL 下是原子的，写者只会整体替换 self.config / self.settings）
     
     def is_admin(self, qq: str) -> bool:
-        """检查是否是管理员"""
-        with self._lock:
-            return str(qq) == str(self.config.get("admin_qq", ""))
+        """检查是否是管理员（与配置的 QQ 号字符串精确比较，未设置管理员时恒为 False）"""
+        admin_qq = self.settings.admin_qq
+        return bool(admin_qq) and str(qq) == admin_qq
     
     def is_enabled(self) -> bool:
         """检查插件是否启用"""
-        with self._lock:
-            return self.config.get("enabled", True)
+        return self.settings.enabled
     
     def is_test_mode(self) -> bool:
         """检查是否测试模式"""
-        with self._lock:
-            return self.config.get("test_mode", False)
+        return self.settings.test_mode
     
     def get_trigger_keyword(self) -> str:
         """获取触发词"""
-        with self._lock:
-            return self.config.get("trigger_keyword", "海梦酱你好鸭")
+        return self.settings.trigger_keyword
     
-    def get_target_groups(self) -> list:
-        """获取目标群列表"""
-        with self._lock:
-            groups = self.config.get("target_groups", [])
-            return [str(g) for g in groups] if isinstance(groups, list) else []
+    def get_target_groups(self) -> tuple:
+        """获取目标群列表（加载/设置时已规范化为 str 元组，只读）
+        
+        成员判断请直接探测 settings.target_groups_set（frozenset，O(1)）
+        """
+        return self.settings.target_groups
     
     def is_in_exchange_time(self) -> bool:
         """检查是否在发放时间内"""
-        with self._lock:
-            exchange_time = self.config.get("exchange_time", {})
-            weekday = exchange_time.get("weekday")
-            hour = exchange_time.get("hour")
-            
-            if weekday is None or hour is None:
-                return False
-            
-            # 校验合法性
-            try:
-                weekday = int(weekday)
-                hour = int(hour)
-                if not (0 <= weekday <= 6) or not (0 <= hour <= 23):
-                    return False
-            except (ValueError, TypeError):
-                return False
-            
-            now = datetime.now()
-            return now.weekday() == weekday and now.hour >= hour
+        et = self.settings.exchange_time
+        if et is None:
+            return False
+        now = datetime.now()
+        return now.weekday() == et[0] and now.hour >= et[1]
     
     def get_exchange_time_str(self) -> str:
         """获取发放时间字符串"""
-        with self._lock:
-            exchange_time = self.config.get("exchange_time", {})
-            weekday = exchange_time.get("weekday")
-            hour = exchange_time.get("hour")
-            
-            if weekday is None or hour is None:
-                return "暂未设置"
-            
-            weekdays = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-            try:
-                weekday = int(weekday)
-                hour = int(hour)
-                if not (0 <= weekday <= 6) or not (0 <= hour <= 23):
-                    return "配置异常，请重新设置"
-                return f"每{weekdays[weekday]} {hour}:00 - 24:00"
-            except (ValueError, TypeError):
-                return "配置异常，请重新设置"
-
+        return self.settings.exchange_time_str
+    
+    def get_exchange_time_tuple(self) -> Optional[tuple]:
+        """获取已校验的发放时间 (weekday, hour)；未设置或非法时返回 None（set 时解析，读取无开销）"""
+        return self.settings.exchange_time
@@ -9,18 +9,65 @@
 
 from pathlib import Path
 import json
-import copy
+import atexit
+import sqlite3
 import threading
 import tempfile
 import os
-from typing import Optional, Tuple, List
+import time
+import random
+import sys
+from types import MappingProxyType
+from typing import NamedTuple, Optional, Tuple, List, Mapping
+from collections import deque
+from contextlib import contextmanager
+import itertools
+from itertools import islice
 from datetime import datetime, timedelta
 from astrbot.api import logger
+from .utils.rwlock import ReadWriteLock
+from .utils.jsonio import json_loads, json_dumps_bytes, json_dumps_str
+
+
+_iso_cache = (0, "")  # (整秒时间戳, ISO 时间串)
+
+
+def _now_iso() -> str:
+    """当前时间的 ISO 字符串（秒级精度，同一秒内复用缓存）
+    
+    用于日志、公告、批量导入等只需秒级精度的时间戳
+    """
+    global _iso_cache
+    t = int(time.time())
+    if t != _iso_cache[0]:
+        _iso_cache = (t, datetime.fromtimestamp(t).isoformat())
+    return _iso_cache[1]
+
+
+HISTORY_MAXLEN = 100  # 抽奖历史保留条数
+LOGS_MAXLEN = 500  # 操作日志保留条数
+_EMPTY_ANNOUNCEMENT = MappingProxyType({"content": "", "time": ""})
+_TEST_CODE_HASH = "TEST****"  # 测试模式历史记录的脱敏码（共享常量）
+
+
+class UserView(NamedTuple):
+    """已注册用户的只读视图（注册信息 + 抽奖计数，一次读锁内取齐）"""
+    reg_code: str
+    reg_time: str
+    imported: bool
+    total_draws: int
+    week_draws: int
+    pity_count: int
 
 
 class DataManager:
     """数据管理器 - 线程安全的数据操作"""
     
+    FLUSH_DELAY = 0.1  # 后台合并写入的延迟（秒）
+    LOG_FLUSH_INTERVAL = 2.0  # 审计日志批量落盘的最长间隔（秒）
+    USED_COMPACT_THRESHOLD = 500  # used 增量层超过该条数时压缩到 codes.db
+    USER_LOCK_STRIPES = 64  # 抽奖用户条带锁数量（须为 2 的幂）
+    
     # 使用类方法获取默认数据，避免浅拷贝污染
     @staticmethod
     def _get_default_structure() -> dict:
@@ -56,7 +103,8 @@ class DataManager:
             "rate_limit": {},     # 预留：限流记录，待接入
             "spam_count": {},     # 预留：刷屏计数，待接入
             "logs": [],
-            "announcement": {"content": "", "time": ""}
+            "announcement": {"content": "", "time": ""},
+            "wal_seq": 0          # 快照已包含的最后一条 WAL 序号
         }
     
     # 卡片档次信息
@@ -76,6 +124,16 @@ class DataManager:
         返回 (datetime, 是否成功) 元组
         """
         try:
+            # 快速路径：插件写入的两种固定格式直接按偏移解析
+            n = len(time_str)
+            if n == 10 and time_str[4] == '-' and time_str[7] == '-':
+                return datetime(int(time_str[0:4]), int(time_str[5:7]), int(time_str[8:10]),
+                                23, 59, 59), True
+            if (n == 19 and time_str[4] == '-' and time_str[7] == '-' and time_str[10] in 'T '
+                    and time_str[13] == ':' and time_str[16] == ':'):
+                return datetime(int(time_str[0:4]), int(time_str[5:7]), int(time_str[8:10]),
+                                int(time_str[11:13]), int(time_str[14:16]), int(time_str[17:19])), True
+            
             dt = datetime.fromisoformat(time_str)
             # 如果是 aware datetime，剥离时区信息保留本地时间
             if dt.tzinfo is not None:
@@ -89,13 +147,67 @@ class DataManager:
     
     def __init__(self, plugin_dir: Path):
         self.data_file = plugin_dir / "data.json"
+        self.used_db_file = plugin_dir / "codes.db"
+        self.used_file = plugin_dir / "data_used.json"  # 旧版全量索引，首次加载时迁移进 codes.db
         self.plugin_dir = plugin_dir
         
-        # 主锁 - 保护所有数据操作
-        self._lock = threading.RLock()  # 使用可重入锁
+        # 读写锁 - 保护所有数据操作（不可重入）
+        # _lock: 写锁，所有修改与落盘使用；_read_lock: 读锁，纯读取方法使用，读者可并发
+        # 注意：持锁期间不得调用其他加锁的公共方法，需复用 *_locked 内部方法
+        self._rwlock = ReadWriteLock()
+        self._lock = self._rwlock.writer
+        self._read_lock = self._rwlock.reader
+        # 用户条带锁：同一 QQ 的抽奖串行化，不同用户的资格预检互不阻塞
+        # 加锁顺序固定为 条带锁 → 读写锁
+        self._user_locks = tuple(threading.Lock() for _ in range(self.USER_LOCK_STRIPES))
+        # 分区锁：黑名单与操作日志独立于其余数据，修改/查询只持各自的锁，不与抽奖、落盘争抢读写锁
+        # 加锁顺序：读写锁 → 分区锁（_save_atomic 持写锁后再短暂获取分区锁取快照）
+        self._blacklist_lock = threading.Lock()
+        self._logs_lock = threading.Lock()
+        self._bl_epoch = 0  # 黑名单修改计数，用于 get_blacklist 缓存失效
+        self._bl_cache = ((), -1)  # (有序元组, 对应的 epoch)
+        
+        # 数据版本号：每次修改递增，供上层按版本缓存渲染结果
+        # 修改可能来自不同的锁（写锁/分区锁），用 count 的 next() 保证递增不丢失
+        self._version_counter = itertools.count(1)
+        self.version = 0
         
         # 加载数据
         self.data = self._load()
+        
+        # WAL：重放上次检查点之后的注册/抽奖记录
+        self.wal_file = plugin_dir / "data.wal"
+        self._wal = None
+        self._wal_seq = self.data.get("wal_seq", 0) or 0
+        replayed = self._replay_wal()
+        
+        self._init_used_store()
+        # 各池 unused deque 的直接引用（deque 只原地修改、不会被替换），省去热路径上的多层字典查找
+        # 池字典同理（池字典从不被整体替换），键为 registration/gold/purple/blue/event
+        self._pools = dict(self._iter_used_pools(self.data))
+        self._unused = {key: pool["unused"] for key, pool in self._pools.items()}
+        self._known_codes = None  # 全局码索引（惰性构建，见 _get_known_codes）
+        self._event_end_cache = ("", None, False)  # (end_time 原串, 解析结果, 是否成功)
+        self._date_cache = (None, "", None)  # (date, 今日 ISO 串, 本周一 date)
+        self._weight_cache = {}  # (有货掩码, 权重...) -> (档次列表, 累积权重)
+        self._rebuild_stat_counters()
+        
+        # 合并写入：修改只打脏标记，由后台线程延迟落盘
+        self._dirty = False
+        self._closed = False
+        self._batch_depth = 0  # batch() 嵌套层数，> 0 时后台线程暂不落盘
+        self._durable_pending = False  # 是否有需要 fsync 的关键修改待写入
+        self._flush_event = threading.Event()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="haimeng-data-flush", daemon=True
+        )
+        self._flush_thread.start()
+        # 进程退出时兜底落盘（未调用 close() 时仍保存尚未写入的日志）
+        atexit.register(self.close)
+        
+        if replayed:
+            # 重放结果立即写入快照（检查点）
+            self.save()
     
     def _load(self) -> dict:
         """
@@ -111,16 +223,11 @@ class DataManager:
         # 尝试加载主文件
         if self.data_file.exists():
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
+                loaded = json_loads(self.data_file.read_bytes())
                 data = self._deep_merge(self._get_default_structure(), loaded)
-                # 确保黑名单是 set
-                if isinstance(data.get("blacklist"), list):
-                    data["blacklist"] = set(data["blacklist"])
-                else:
-                    data["blacklist"] = set()
                 self._migrate_used_index(data)
                 self._validate_schema(data)
+                self._convert_runtime_containers(data)
                 return data
             except json.JSONDecodeError as e:
                 logger.error(f"[海梦酱] 数据文件格式错误: {e}，尝试从备份恢复...")
@@ -134,15 +241,11 @@ class DataManager:
         # 尝试从备份恢复
         if backup_file.exists():
             try:
-                with open(backup_file, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
+                loaded = json_loads(backup_file.read_bytes())
                 data = self._deep_merge(self._get_default_structure(), loaded)
-                if isinstance(data.get("blacklist"), list):
-                    data["blacklist"] = set(data["blacklist"])
-                else:
-                    data["blacklist"] = set()
                 self._migrate_used_index(data)
                 self._validate_schema(data)
+                self._convert_runtime_containers(data)
                 
                 # 备份恢复成功，修复主文件
                 logger.warning("[海梦酱] ⚠️ 从备份恢复成功！正在修复主文件...")
@@ -160,9 +263,28 @@ class DataManager:
         # 返回默认数据
         logger.warning("[海梦酱] 使用默认数据结构初始化")
         data = self._get_default_structure()
-        data["blacklist"] = set()
+        self._convert_runtime_containers(data)
         return data
     
+    @staticmethod
+    def _convert_runtime_containers(data: dict):
+        """转换为运行时容器
+        
+        - 未使用码池转为 deque：发码为 FIFO，popleft() 为 O(1)
+        - 抽奖历史 / 操作日志转为定长 deque：appendleft 为 O(1)，超出自动淘汰
+        - 黑名单转为 set：之后所有方法直接按 set 使用，不再逐次判断类型
+        """
+        blacklist = data.get("blacklist")
+        data["blacklist"] = set(blacklist) if isinstance(blacklist, (list, set)) else set()
+        for key, maxlen in (("lottery_history", HISTORY_MAXLEN), ("logs", LOGS_MAXLEN)):
+            items = data.get(key)
+            data[key] = deque(items if isinstance(items, (list, deque)) else (), maxlen=maxlen)
+        pools = [data["registration_codes"], data["event_pool"]["cards"]]
+        pools.extend(data["lottery_pool"][tier] for tier in ["gold", "purple", "blue"])
+        for pool in pools:
+            unused = pool.get("unused")
+            pool["unused"] = deque(unused) if isinstance(unused, (list, deque)) else deque()
+    
     def _migrate_used_index(self, data: dict):
         """
         迁移旧版 used 索引：qq->code → code->{qq,time}
@@ -276,60 +398,282 @@ class DataManager:
             logger.warning("[海梦酱] schema校验: event_pool.enabled 类型异常，回退为 False")
     
     def _deep_merge(self, default: dict, loaded: dict) -> dict:
-        """深度合并（使用深拷贝避免污染）"""
-        result = copy.deepcopy(default)
-        for key, value in loaded.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = self._deep_merge(result[key], value)
-            else:
-                result[key] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
-        return result
+        """深度合并（迭代实现，原地写入 default）
+        
+        default 来自 _get_default_structure() 的新副本，loaded 来自刚解析的 JSON，
+        两者都是新对象，直接引用叶子值即可，无需深拷贝（大 used 索引不再整体复制）。
+        """
+        stack = [(default, loaded)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in source.items():
+                current = target.get(key)
+                if isinstance(current, dict) and isinstance(value, dict):
+                    stack.append((current, value))
+                else:
+                    target[key] = value
+        return default
+    
+    # ==================== used 索引分库存储 ====================
+    #
+    # data.json 只保存自上次压缩以来新增/修改的 used 记录（增量层），
+    # 全量 used 索引保存在 SQLite 库 codes.db，首次需要时才加载（惰性加载）。
+    # - 未加载时：pool["used"] 就是增量层字典本身
+    # - 加载后：pool["used"] 为 全量 + 增量 合并结果，新记录同时写入增量层
+    # 增量层超过 USED_COMPACT_THRESHOLD 条时，保存时把增量行插入 codes.db 并清空，
+    # 不再整体重写全量索引。旧版 data_used.json 首次打开库时自动导入。
+    
+    @staticmethod
+    def _iter_used_pools(data: dict):
+        """遍历所有带 used 索引的池：(键, 池字典)"""
+        yield "registration", data["registration_codes"]
+        for tier in ["gold", "purple", "blue"]:
+            yield tier, data["lottery_pool"][tier]
+        yield "event", data["event_pool"]["cards"]
+    
+    def _init_used_store(self):
+        """加载后初始化增量层（此时 pool["used"] 即 data.json 中的增量记录）"""
+        self._used_loaded = False
+        self._used_broken = False  # codes.db 不可用时禁止压缩，增量记录继续保存在 data.json
+        self._used_load_lock = threading.Lock()
+        self._used_db = None
+        self._used_overlay = {key: pool["used"] for key, pool in self._iter_used_pools(self.data)}
+    
+    def _open_used_db(self) -> sqlite3.Connection:
+        """打开（必要时创建）codes.db，首次创建时迁移旧版 data_used.json"""
+        if self._used_db is not None:
+            return self._used_db
+        db = sqlite3.connect(str(self.used_db_file), check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            # 压缩后 data.json 不再包含这些记录，提交必须先于快照落盘
+            db.execute("PRAGMA synchronous=FULL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS used ("
+                "pool TEXT NOT NULL, code TEXT NOT NULL, qq TEXT, time TEXT, info TEXT NOT NULL, "
+                "PRIMARY KEY (pool, code))"
+            )
+            db.commit()
+            empty = db.execute("SELECT 1 FROM used LIMIT 1").fetchone() is None
+            if empty and (self.used_file.exists() or Path(str(self.used_file) + '.bak').exists()):
+                self._migrate_used_json(db)
+        except Exception:
+            db.close()
+            raise
+        self._used_db = db
+        return db
+    
+    def _migrate_used_json(self, db: sqlite3.Connection):
+        """把旧版 data_used.json 导入 codes.db，成功后改名为 .migrated"""
+        bulk = None
+        for path in (self.used_file, Path(str(self.used_file) + '.bak')):
+            if not path.exists():
+                continue
+            try:
+                bulk = json_loads(path.read_bytes())
+                break
+            except Exception as e:
+                logger.error(f"[海梦酱] 加载 used 索引 {path.name} 失败: {e}")
+        if bulk is None:
+            raise ValueError("data_used.json 已损坏，无法迁移")
+        
+        # 以 data.json 同构的结构合并，复用旧格式迁移
+        structure = self._deep_merge(self._get_default_structure(), bulk)
+        self._migrate_used_index(structure)
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO used (pool, code, qq, time, info) VALUES (?, ?, ?, ?, ?)",
+                self._used_rows({key: pool["used"] for key, pool in self._iter_used_pools(structure)})
+            )
+        if self.used_file.exists():
+            os.replace(self.used_file, str(self.used_file) + '.migrated')
+        logger.info("[海梦酱] 已将 data_used.json 迁移到 codes.db")
+    
+    @staticmethod
+    def _used_rows(used_by_pool: dict):
+        """把 {池: {code: info}} 展开为 used 表的行"""
+        for key, used in used_by_pool.items():
+            for code, info in used.items():
+                if isinstance(info, dict):
+                    yield key, code, info.get("qq"), info.get("time"), json_dumps_str(info)
+                else:
+                    yield key, code, None, None, json_dumps_str(info)
+    
+    def _ensure_used_loaded(self):
+        """惰性加载全量 used 索引并与增量层合并（调用者已持有读锁或写锁）"""
+        if self._used_loaded:
+            return
+        with self._used_load_lock:
+            if self._used_loaded:
+                return
+            bulk = {key: {} for key in self._used_overlay}
+            try:
+                db = self._open_used_db()
+                for key, code, info in db.execute("SELECT pool, code, info FROM used"):
+                    if key in bulk:
+                        bulk[key][code] = json_loads(info)
+            except Exception as e:
+                self._used_broken = True
+                logger.error(f"[海梦酱] 加载 used 索引 codes.db 失败: {e}，暂停压缩写入，仅保留增量记录")
+                bulk = {key: {} for key in self._used_overlay}
+            
+            live = dict(self._iter_used_pools(self.data))
+            for key, merged in bulk.items():
+                merged.update(self._used_overlay[key])
+                live[key]["used"] = merged
+            self._used_loaded = True
+    
+    def _used_count_locked(self, key: str) -> int:
+        """某个池的已使用数量（调用者已持有读锁或写锁）
+        
+        未加载全量索引时用 SQL COUNT 统计，再加上尚未压缩进数据库的增量记录，
+        不解码 used 行；没有 codes.db（也没有待迁移的旧文件）时不创建数据库
+        """
+        with self._used_load_lock:
+            if self._used_loaded:
+                return len(dict(self._iter_used_pools(self.data))[key]["used"])
+            overlay = self._used_overlay[key]
+            if self._used_db is None and not (
+                self.used_db_file.exists() or self.used_file.exists()
+                or Path(str(self.used_file) + '.bak').exists()
+            ):
+                return len(overlay)
+            try:
+                db = self._open_used_db()
+                count = db.execute("SELECT COUNT(*) FROM used WHERE pool = ?", (key,)).fetchone()[0]
+                # 压缩提交后、快照落盘前崩溃时，增量层与数据库会有重复行（合并时幂等），这里去重
+                codes = list(overlay)
+                for i in range(0, len(codes), 500):
+                    chunk = codes[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    count -= db.execute(
+                        f"SELECT COUNT(*) FROM used WHERE pool = ? AND code IN ({placeholders})",
+                        (key, *chunk)
+                    ).fetchone()[0]
+                return count + len(codes)
+            except Exception as e:
+                logger.warning(f"[海梦酱] 统计 used 数量失败: {e}，仅计入增量记录")
+                return len(overlay)
     
-    def _save_atomic(self):
+    def _record_used(self, key: str, pool: dict, code: str, info: dict):
+        """写入一条 used 记录（调用者已持有写锁）"""
+        pool["used"][code] = info
+        if self._used_loaded:
+            self._used_overlay[key][code] = info
+    
+    def _compact_used(self):
+        """把增量层写入 codes.db 并清空（调用者已持有写锁）
+        
+        只插入增量行，不需要加载或重写全量索引
+        """
+        if self._used_broken:
+            return
+        db = self._open_used_db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO used (pool, code, qq, time, info) VALUES (?, ?, ?, ?, ?)",
+                self._used_rows(self._used_overlay)
+            )
+        if self._used_loaded:
+            self._used_overlay = {key: {} for key in self._used_overlay}
+        else:
+            # 未加载时 pool["used"] 就是增量层本身，一并换成空字典
+            self._used_overlay = {}
+            for key, pool in self._iter_used_pools(self.data):
+                pool["used"] = self._used_overlay[key] = {}
+    
+    def _save_atomic(self, fsync: bool = True):
         """
         原子写入数据文件
         
         Windows策略：原文件 -> 备份 -> 新文件写入 -> 删备份
         Unix策略：临时文件 -> os.replace 原子替换
+        
+        fsync=False 时只保证替换的原子性（断电可能丢失最近一次写入），
+        仅用于日志、每周重置等非关键修改
         """
-        data_to_save = copy.deepcopy(self.data)
+        # 增量层过大时先压缩到 codes.db（先提交数据库、后写 data.json，
+        # 中途崩溃只会留下已在数据库里的增量记录，合并时幂等）
+        if sum(len(v) for v in self._used_overlay.values()) > self.USED_COMPACT_THRESHOLD:
+            try:
+                self._compact_used()
+            except Exception as e:
+                logger.error(f"[海梦酱] 压缩 used 索引失败: {e}，增量记录继续保存在 data.json")
         
-        # 转换 set 为 list
-        if isinstance(data_to_save.get("blacklist"), set):
-            data_to_save["blacklist"] = list(data_to_save["blacklist"])
+        # 调用者已持有锁，序列化期间没有并发写者：只做顶层浅拷贝，
+        # 其余容器直接传引用给编码器（编码器只读不写），避免 deepcopy 开销
+        # 黑名单与日志由分区锁保护，可能在序列化期间被修改，先在分区锁内取快照
+        data_to_save = dict(self.data)
+        with self._blacklist_lock:
+            data_to_save["blacklist"] = sorted(self.data["blacklist"])
+        with self._logs_lock:
+            data_to_save["logs"] = list(self.data["logs"])
         
+        # used 只写增量层（替换为浅拷贝的池字典，不修改运行时数据）
+        overlay = self._used_overlay
+        data_to_save["registration_codes"] = {**self.data["registration_codes"], "used": overlay["registration"]}
+        data_to_save["lottery_pool"] = {
+            tier: {**pool, "used": overlay[tier]} for tier, pool in self.data["lottery_pool"].items()
+        }
+        event_pool = self.data["event_pool"]
+        data_to_save["event_pool"] = {**event_pool, "cards": {**event_pool["cards"], "used": overlay["event"]}}
+        
+        data_to_save["wal_seq"] = self._wal_seq
+        self._write_json_atomic(self.data_file, data_to_save, 'data_', fsync)
+        
+        # 快照已包含全部 WAL 记录，清空 WAL
+        self.data["wal_seq"] = self._wal_seq
+        try:
+            self._truncate_wal()
+        except OSError as e:
+            # 清空失败不影响正确性：重放时按 wal_seq 跳过
+            logger.warning(f"[海梦酱] 清空 WAL 失败: {e}")
+    
+    def _write_json_atomic(self, target: Path, obj, prefix: str, fsync: bool = True):
+        """原子写入 JSON 文件（fsync + 替换；Windows 保留 .bak 供恢复）"""
         # 写入临时文件
         fd, temp_path = tempfile.mkstemp(
             dir=self.plugin_dir, 
-            prefix='data_', 
+            prefix=prefix, 
             suffix='.tmp'
         )
         try:
-            with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, indent=2, ensure_ascii=False)
+            payload = json_dumps_bytes(obj, indent=True)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
             
             if os.name == 'nt':  # Windows - 使用备份策略
-                backup_path = str(self.data_file) + '.bak'
+                backup_path = str(target) + '.bak'
                 
                 # 1. 原文件存在则先备份（保留备份供异常恢复）
-                if self.data_file.exists():
+                if target.exists():
                     try:
                         if os.path.exists(backup_path):
                             os.remove(backup_path)
-                        os.rename(self.data_file, backup_path)
+                        os.rename(target, backup_path)
                     except OSError as e:
                         logger.warning(f"[海梦酱] 备份失败，尝试直接替换: {e}")
                 
                 # 2. 临时文件重命名为目标文件
-                os.rename(temp_path, self.data_file)
+                os.rename(temp_path, target)
                 
                 # 注意：不删除备份文件，_load() 依赖 .bak 做异常恢复
                     
             else:  # Unix - os.replace 原子替换
-                os.replace(temp_path, self.data_file)
+                os.replace(temp_path, target)
+                # fsync 父目录，确保 rename 本身落盘
+                if fsync and hasattr(os, 'O_DIRECTORY'):
+                    dir_fd = os.open(self.plugin_dir, os.O_RDONLY | os.O_DIRECTORY)
+                    try:
+                        os.fsync(dir_fd)
+                    finally:
+                        os.close(dir_fd)
                 
         except Exception as e:
-            logger.error(f"[海梦酱] 保存数据失败: {e}")
+            logger.error(f"[海梦酱] 保存数据失败（{target.name}）: {e}")
             # 清理临时文件
             try:
                 if os.path.exists(temp_path):
@@ -338,10 +682,204 @@ class DataManager:
                 pass
             raise
     
+    # ==================== WAL（注册/抽奖增量日志） ====================
+    #
+    # 注册与抽奖每次只向 data.wal 追加一行增量并 fsync，不再整体重写 data.json；
+    # 后台线程写全量快照（检查点）时记录 wal_seq 并清空 WAL。
+    # 启动时重放 seq > wal_seq 的记录，已包含在快照中的记录自动跳过（幂等）。
+    
+    def _append_wal(self, entry: dict):
+        """追加一条 WAL 记录并标记脏数据（调用者已持有写锁）"""
+        self._wal_seq += 1
+        entry["seq"] = self._wal_seq
+        try:
+            line = json_dumps_bytes(entry)
+            if self._wal is None:
+                self._wal = open(self.wal_file, 'ab')
+            self._wal.write(line + b"\n")
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+        except Exception as e:
+            # WAL 写入失败则退回同步全量保存，保证不丢数据
+            logger.error(f"[海梦酱] 写入 WAL 失败: {e}，改为立即保存")
+            # 先打脏标记（同时推进 version，缓存的库存/状态视图随之失效）
+            self._mark_dirty()
+            try:
+                self._save_clean_locked()
+            except Exception as save_err:
+                # 事务已在内存中完成，不向调用方抛出；保留脏标记由后台线程重试
+                logger.error(f"[海梦酱] 立即保存也失败: {save_err}，保留脏标记等待后台重试")
+            return
+        self._mark_dirty()
+    
+    def _truncate_wal(self):
+        """检查点完成后清空 WAL（调用者已持有写锁）"""
+        if self._wal is not None:
+            self._wal.seek(0)
+            self._wal.truncate()
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+        elif self.wal_file.exists() and self.wal_file.stat().st_size:
+            with open(self.wal_file, 'wb') as f:
+                f.flush()
+                os.fsync(f.fileno())
+    
+    @staticmethod
+    def _take_unused(unused: deque, code: str):
+        """重放时从未使用池移除已发出的码（通常位于队首）"""
+        if unused and unused[0] == code:
+            unused.popleft()
+        else:
+            try:
+                unused.remove(code)
+            except ValueError:
+                pass
+    
+    def _replay_wal(self) -> int:
+        """启动时重放 WAL（在 _init_used_store 之前调用），返回重放条数"""
+        if not self.wal_file.exists():
+            return 0
+        try:
+            raw_lines = self.wal_file.read_bytes().splitlines()
+        except OSError as e:
+            logger.error(f"[海梦酱] 读取 WAL 失败: {e}")
+            return 0
+        
+        data = self.data
+        base_seq = data.get("wal_seq", 0) or 0
+        replayed = 0
+        for raw in raw_lines:
+            if not raw.strip():
+                continue
+            try:
+                entry = json_loads(raw)
+                seq = entry["seq"]
+            except Exception:
+                # 崩溃时可能留下半行，忽略
+                logger.warning("[海梦酱] WAL 存在残缺记录，已跳过")
+                continue
+            self._wal_seq = max(self._wal_seq, seq)
+            if seq <= base_seq:
+                continue  # 已包含在快照中
+            
+            op = entry.get("op")
+            qq = entry.get("qq")
+            code = entry.get("code")
+            if op == "register":
+                reg = data["registration_codes"]
+                if not entry.get("test"):
+                    self._take_unused(reg["unused"], code)
+                reg["used"][code] = {"qq": qq, "time": entry["time"]}
+                data["registered_users"][qq] = {
+                    "reg_code": code, "reg_time": entry["time"], "imported": False
+                }
+            elif op == "draw":
+                tier = entry.get("tier")
+                if code is not None:
+                    pool = data["event_pool"]["cards"] if tier == "event" else data["lottery_pool"][tier]
+                    self._take_unused(pool["unused"], code)
+                    pool["used"][code] = {"qq": qq, "time": entry["time"]}
+                data["user_lottery"][qq] = entry["user"]
+                data["lottery_history"].appendleft(entry["history"])
+            else:
+                logger.warning(f"[海梦酱] WAL 未知操作 {op!r}，已跳过")
+                continue
+            replayed += 1
+        
+        if replayed:
+            logger.info(f"[海梦酱] 已从 WAL 重放 {replayed} 条记录")
+        return replayed
+    
+    def _mark_dirty(self, durable: bool = True):
+        """标记数据已修改，由后台写入线程合并落盘（调用者已持有锁）
+        
+        持久性语义：修改在约 FLUSH_DELAY 秒内写入磁盘。
+        durable=False 表示非关键修改：若合并期间没有关键修改，本次写入跳过 fsync。
+        """
+        self._dirty = True
+        self.version = next(self._version_counter)
+        if durable:
+            self._durable_pending = True
+        self._flush_event.set()
+    
+    def _flush_loop(self):
+        """后台写入线程：等待脏标记，延迟一小段时间合并后续修改，再一次性保存
+        
+        仅有日志修改时不唤醒线程，由每 LOG_FLUSH_INTERVAL 秒一次的定时检查批量写入
+        """
+        while True:
+            triggered = self._flush_event.wait(self.LOG_FLUSH_INTERVAL)
+            if self._closed:
+                return
+            if triggered:
+                time.sleep(self.FLUSH_DELAY)
+            with self._lock:
+                self._flush_event.clear()
+                if not self._dirty or self._batch_depth:
+                    continue
+                try:
+                    self._save_clean_locked(fsync=self._durable_pending)
+                except Exception:
+                    # _save_atomic 已记录错误；保留脏标记，下次修改时重试
+                    pass
+    
+    @contextmanager
+    def batch(self):
+        """批量修改：块内的修改暂不落盘，退出最外层块时统一保存一次
+        
+        用法：
+            with dm.batch():
+                for qq in qq_list:
+                    dm.add_to_blacklist(qq)
+        
+        注意：不要在持有本对象锁时进入（锁不可重入）
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self._save_clean_locked()
+    
     def save(self):
-        """保存数据（加锁 + 原子写入）"""
+        """保存数据（加锁 + 原子写入，同步立即落盘）"""
+        with self._lock:
+            self._save_clean_locked()
+    
+    def _save_clean_locked(self, fsync: bool = True):
+        """清除脏标记并保存，失败时恢复标记（调用者已持有写锁）
+        
+        先清标记再序列化：黑名单/日志只持分区锁修改，
+        快照之后到达的修改会重新打上脏标记，不会被误清
+        """
+        durable = self._durable_pending
+        self._dirty = False
+        self._durable_pending = False
+        try:
+            self._save_atomic(fsync)
+        except Exception:
+            self._dirty = True
+            self._durable_pending = self._durable_pending or durable
+            raise
+    
+    def close(self):
+        """停止后台写入线程并同步保存（插件卸载时调用）"""
+        atexit.unregister(self.close)
+        self._closed = True
+        self._flush_event.set()
+        if self._flush_thread.is_alive():
+            self._flush_thread.join(timeout=2)
+        self.save()
         with self._lock:
-            self._save_atomic()
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            if self._used_db is not None:
+                self._used_db.close()
+                self._used_db = None
     
     # ==================== 注册码 - 原子事务 ====================
     
@@ -360,37 +898,61 @@ class DataManager:
             
             # 2. 获取注册码
             now = datetime.now()
+            now_iso = now.isoformat()
             if test_mode:
                 code = f"TEST-REG-{qq}"
             else:
-                unused = self.data["registration_codes"]["unused"]
+                unused = self._unused["registration"]
                 if not unused:
                     return False, "no_stock", None
-                code = unused.pop(0)
+                code = unused.popleft()
             
             # 3. 记录注册（用 code -> info 索引，确保已发码全集完整）
-            self.data["registration_codes"]["used"][code] = {"qq": qq, "time": now.isoformat()}
+            self._record_used("registration", self.data["registration_codes"], code,
+                              {"qq": qq, "time": now_iso})
+            if self._known_codes is not None:
+                self._known_codes.add(code)
             self.data["registered_users"][qq] = {
                 "reg_code": code,
-                "reg_time": now.isoformat(),
+                "reg_time": now_iso,
                 "imported": False
             }
             
-            # 4. 保存
-            self._save_atomic()
+            # 4. 保存：先追加 WAL（立即持久），全量快照由后台线程合并写入
+            self._append_wal({
+                "op": "register", "qq": qq, "code": code,
+                "time": now_iso, "test": test_mode
+            })
             
             return True, "success", code
     
     def is_registered(self, qq: str) -> bool:
         """检查是否已注册"""
-        with self._lock:
+        with self._read_lock:
             return qq in self.data["registered_users"]
     
     def get_user_info(self, qq: str) -> Optional[dict]:
         """获取用户信息"""
-        with self._lock:
+        with self._read_lock:
+            info = self.data["registered_users"].get(qq)
+            # 用户信息只含标量，浅拷贝即可
+            return dict(info) if info else None
+    
+    def get_user_view(self, qq: str) -> Optional[UserView]:
+        """获取用户视图（未注册返回 None）；注册信息与抽奖数据在同一次读锁内读取"""
+        with self._read_lock:
             info = self.data["registered_users"].get(qq)
-            return copy.deepcopy(info) if info else None
+            if info is None:
+                return None
+            lottery = self.data["user_lottery"].get(qq) or {}
+            return UserView(
+                reg_code=info.get("reg_code") or "未知",
+                reg_time=info.get("reg_time") or "未知",
+                imported=bool(info.get("imported")),
+                total_draws=lottery.get("total_draws", 0),
+                week_draws=lottery.get("week_draws", 0),
+                pity_count=lottery.get("pity_count", 0),
+            )
     
     # ==================== 抽奖 - 完整原子事务 ====================
     
@@ -398,7 +960,9 @@ class DataManager:
         """
         完整抽奖原子事务：资格检查 + 档次决定 + 扣库存 + 记账
         
-        所有操作在同一个锁内完成，防止并发超发
+        分两阶段：
+        1. 持用户条带锁 + 读锁做资格预检（不修改数据），被拒绝的请求不争抢写锁
+        2. 持写锁重新校验并完成扣码记账，防止并发超发
         
         Args:
             qq: 用户QQ
@@ -407,48 +971,90 @@ class DataManager:
         Returns:
             (成功, 状态/原因, 档次, 兑换码)
         """
+        with self._user_locks[hash(qq) & (self.USER_LOCK_STRIPES - 1)]:
+            reason = self._precheck_draw(qq)
+            if reason:
+                return False, reason, None, None
+            return self._draw_locked(qq, test_mode)
+    
+    def _precheck_draw(self, qq: str) -> Optional[str]:
+        """抽奖资格预检（读锁，只读不写），返回拒绝原因；通过返回 None
+        
+        结论仅作快速拒绝，最终以 _draw_locked 在写锁内的校验为准
+        """
+        with self._read_lock:
+            now = datetime.now()
+            today, this_monday = self._get_date_keys(now)
+            user_data = self.data["user_lottery"].get(qq)
+            if user_data is not None:
+                week_draws, day_draws = self._period_counts(user_data, today, this_monday)
+                reason = self._limit_reason(self.data["lottery_config"], week_draws, day_draws)
+                if reason:
+                    return reason
+            if not any(self._unused[key] for key in ("gold", "purple", "blue", "event")):
+                return "奖池已空，请联系久补充~"
+            return None
+    
+    @staticmethod
+    def _period_counts(user_data: dict, today: str, this_monday) -> Tuple[int, int]:
+        """按日期/周边界计算用户当前有效的 (本周次数, 今日次数)，不修改记录"""
+        day_draws = user_data.get("day_draws", 0) if user_data.get("last_draw_date") == today else 0
+        week_draws = user_data.get("week_draws", 0)
+        last_draw = user_data.get("last_draw")
+        if last_draw:
+            try:
+                last_draw_dt = datetime.fromisoformat(last_draw)
+                last_monday = last_draw_dt - timedelta(days=last_draw_dt.weekday())
+                if last_monday.date() < this_monday:
+                    week_draws = 0
+            except ValueError:
+                pass
+        return week_draws, day_draws
+    
+    @staticmethod
+    def _limit_reason(config: dict, week_draws: int, day_draws: int) -> Optional[str]:
+        """检查周/日限制，返回拒绝原因；未超限返回 None"""
+        weekly_limit = config.get("weekly_limit", 1)
+        if weekly_limit > 0 and week_draws >= weekly_limit:
+            return "本周抽奖次数已用完"
+        daily_limit = config.get("daily_limit", 0)
+        if daily_limit > 0 and day_draws >= daily_limit:
+            return "今日抽奖次数已用完"
+        return None
+    
+    def _draw_locked(self, qq: str, test_mode: bool) -> Tuple[bool, str, Optional[str], Optional[str]]:
+        """抽奖事务主体（写锁内重新校验并扣码记账）"""
         with self._lock:
             now = datetime.now()
-            today = now.date().isoformat()
+            today, this_monday = self._get_date_keys(now)
             config = self.data["lottery_config"]
             
             # ========== 1. 资格检查（在锁内）==========
             
-            # 获取或初始化用户数据
-            if qq not in self.data["user_lottery"]:
-                self.data["user_lottery"][qq] = {
+            # 获取用户数据；新用户先用本地默认记录，抽奖成功后才写入（被拒绝的请求不留下空记录）
+            user_data = self.data["user_lottery"].get(qq)
+            is_new_user = user_data is None
+            if is_new_user:
+                user_data = {
                     "pity_count": 0, "total_draws": 0,
                     "week_draws": 0, "day_draws": 0,
                     "last_draw": "", "last_draw_date": ""
                 }
+            else:
+                # 重置日/周计数
+                # 注：即使 weekly_limit 为 0 也要重置周计数，否则之后开启周限制时会沿用过期计数
+                week_draws, day_draws = self._period_counts(user_data, today, this_monday)
+                if user_data.get("last_draw_date") != today:
+                    user_data["day_draws"] = 0
+                if week_draws != user_data.get("week_draws", 0):
+                    user_data["week_draws"] = 0
             
-            user_data = self.data["user_lottery"][qq]
-            
-            # 重置日计数
-            if user_data.get("last_draw_date") != today:
-                user_data["day_draws"] = 0
-            
-            # 检查是否新的一周
-            last_draw = user_data.get("last_draw")
-            if last_draw:
-                try:
-                    last_draw_dt = datetime.fromisoformat(last_draw)
-                    last_monday = last_draw_dt - timedelta(days=last_draw_dt.weekday())
-                    this_monday = now - timedelta(days=now.weekday())
-                    if last_monday.date() < this_monday.date():
-                        user_data["week_draws"] = 0
-                except ValueError:
-                    pass
-            
-            # 检查周限制
-            weekly_limit = config.get("weekly_limit", 1)
-            if weekly_limit > 0 and user_data.get("week_draws", 0) >= weekly_limit:
-                return False, "本周抽奖次数已用完", None, None
-            
-            # 检查日限制
-            daily_limit = config.get("daily_limit", 0)
-            if daily_limit > 0 and user_data.get("day_draws", 0) >= daily_limit:
-                return False, "今日抽奖次数已用完", None, None
+            # 检查周/日限制
+            reason = self._limit_reason(
+                config, user_data.get("week_draws", 0), user_data.get("day_draws", 0)
+            )
+            if reason:
+                return False, reason, None, None
             
             # ========== 2. 检查库存（事务内实时校验活动卡到期）==========
             
@@ -457,23 +1063,26 @@ class DataManager:
             if self.data["event_pool"]["enabled"]:
                 end_time = self.data["event_pool"]["end_time"]
                 if end_time:
-                    end_dt, ok = self._parse_naive_datetime(end_time)
-                    if ok and datetime.now() <= end_dt:
+                    end_dt, ok = self._get_event_end_dt(end_time)
+                    if ok and now <= end_dt:
                         event_available = True
                     elif not ok:
                         # 解析失败 → fail-close
                         self.data["event_pool"]["enabled"] = False
+                        self.version = next(self._version_counter)
                     else:
                         # 已过期，同步关闭
                         self.data["event_pool"]["enabled"] = False
+                        self.version = next(self._version_counter)
                 else:
                     event_available = True  # 无结束时间 = 手动关闭前有效
             
+            unused = self._unused
             pools = {
-                "gold": len(self.data["lottery_pool"]["gold"]["unused"]),
-                "purple": len(self.data["lottery_pool"]["purple"]["unused"]),
-                "blue": len(self.data["lottery_pool"]["blue"]["unused"]),
-                "event": len(self.data["event_pool"]["cards"]["unused"]) if event_available else 0
+                "gold": len(unused["gold"]),
+                "purple": len(unused["purple"]),
+                "blue": len(unused["blue"]),
+                "event": len(unused["event"]) if event_available else 0
             }
             
             total_stock = pools["gold"] + pools["purple"] + pools["blue"] + pools["event"]
@@ -518,27 +1127,28 @@ class DataManager:
             
             # ========== 4. 取码 ==========
             
+            now_iso = now.isoformat()  # 本次事务内所有记录共用同一时间串
+            
             if test_mode:
                 code = f"TEST-{tier.upper()}-{qq}-{now.strftime('%H%M%S')}"
             else:
-                if tier == "event":
-                    pool = self.data["event_pool"]["cards"]
-                else:
-                    pool = self.data["lottery_pool"][tier]
-                
-                if not pool["unused"]:
+                pool = self._pools[tier]
+                unused = self._unused[tier]
+                if not unused:
                     return False, "no_stock", None, None
                 
-                code = pool["unused"].pop(0)
+                code = unused.popleft()
                 # 改为 code -> {qq, time}，确保已发码全集完整，不会被覆盖
-                pool["used"][code] = {"qq": qq, "time": now.isoformat()}
+                self._record_used(tier, pool, code, {"qq": qq, "time": now_iso})
             
             # ========== 5. 更新用户数据（test_mode也记账）==========
             
+            if is_new_user:
+                self.data["user_lottery"][qq] = user_data
             user_data["total_draws"] += 1
             user_data["week_draws"] = user_data.get("week_draws", 0) + 1
             user_data["day_draws"] = user_data.get("day_draws", 0) + 1
-            user_data["last_draw"] = now.isoformat()
+            user_data["last_draw"] = now_iso
             user_data["last_draw_date"] = today
             
             # 更新保底计数
@@ -549,510 +1159,531 @@ class DataManager:
             
             # ========== 6. 记录历史（脱敏）==========
             
-            self.data["lottery_history"].insert(0, {
+            record = {
                 "qq": qq,
                 "tier": tier,
-                "code_hash": code[:4] + "****" if not test_mode else "TEST****",
-                "time": now.isoformat()
-            })
-            self.data["lottery_history"] = self.data["lottery_history"][:100]
+                "code_hash": _TEST_CODE_HASH if test_mode else code[:4] + "****",
+                "time": now_iso
+            }
+            self._append_history_locked(record)
+            self._total_draws += 1
             
             # ========== 7. 保存 ==========
             # test_mode 保存次数数据（防重启重置），但不消耗真实码
             # 因为test_mode取的是假码，真实库存未变
-            self._save_atomic()
+            # 先追加 WAL（只写本次增量，立即持久），全量快照由后台线程合并写入
+            self._append_wal({
+                "op": "draw", "qq": qq, "tier": tier,
+                "code": None if test_mode else code,
+                "time": now_iso, "user": dict(user_data), "history": record
+            })
             
             return True, "success", tier, code
     
-    def _weighted_random_internal(self, pools: dict, config: dict) -> Optional[str]:
-        """内部加权随机（供原子事务调用，不加锁）"""
-        import random
-        
-        weights = {}
-        
-        # 活动卡池（权重从config读取，与展示一致）
-        if pools.get("event", 0) > 0 and self.data["event_pool"]["enabled"]:
-            weights["event"] = max(1, int(config.get("event_weight", 10) or 1))
+    def _rebuild_stat_counters(self):
+        """从数据全量重建统计计数器（仅加载时调用一次，之后增量维护）
         
-        if pools.get("gold", 0) > 0:
-            weights["gold"] = max(1, int(config.get("gold_weight", 5) or 1))
-        if pools.get("purple", 0) > 0:
-            weights["purple"] = max(1, int(config.get("purple_weight", 20) or 1))
-        if pools.get("blue", 0) > 0:
-            weights["blue"] = max(1, int(config.get("blue_weight", 75) or 1))
+        - _tier_counts: 抽奖历史窗口内各档次条数
+        - _total_draws: 全部用户累计抽奖次数
+        """
+        tier_counts = {"gold": 0, "purple": 0, "blue": 0, "event": 0}
+        for record in self.data["lottery_history"]:
+            tier = record.get("tier", "")
+            if tier in tier_counts:
+                tier_counts[tier] += 1
+        self._tier_counts = tier_counts
+        self._total_draws = sum(u.get("total_draws", 0) for u in self.data["user_lottery"].values())
+    
+    def _append_history_locked(self, record: dict):
+        """追加抽奖历史并同步档次计数（调用者已持有写锁）"""
+        history = self.data["lottery_history"]
+        tier_counts = self._tier_counts
+        if len(history) == history.maxlen:
+            evicted = history[-1].get("tier", "")
+            if evicted in tier_counts:
+                tier_counts[evicted] -= 1
+        history.appendleft(record)
+        if record["tier"] in tier_counts:
+            tier_counts[record["tier"]] += 1
+    
+    def _get_date_keys(self, now: datetime):
+        """返回 (今日 ISO 日期串, 本周一 date)，按日期缓存，同一天内不重复计算"""
+        d = now.date()
+        cache = self._date_cache
+        if cache[0] != d:
+            cache = self._date_cache = (d, d.isoformat(), d - timedelta(days=d.weekday()))
+        return cache[1], cache[2]
+    
+    def _weighted_random_internal(self, pools: dict, config: dict) -> Optional[str]:
+        """内部加权随机（供原子事务调用，不加锁）
         
-        if not weights:
+        累积权重表按 (有货掩码, 各档权重) 缓存，抽取交给 C 实现的 random.choices
+        """
+        event_on = pools.get("event", 0) > 0 and self.data["event_pool"]["enabled"]
+        mask = (
+            (1 if event_on else 0)
+            | (2 if pools.get("gold", 0) > 0 else 0)
+            | (4 if pools.get("purple", 0) > 0 else 0)
+            | (8 if pools.get("blue", 0) > 0 else 0)
+        )
+        if not mask:
             return None
         
-        total = sum(weights.values())
-        if total <= 0:
-            # 理论上不会到这里（已clamp），但做最终防线
-            return list(weights.keys())[0]
-        
-        r = random.randint(1, total)
+        key = (mask, config.get("event_weight", 10), config.get("gold_weight", 5),
+               config.get("purple_weight", 20), config.get("blue_weight", 75))
+        table = self._weight_cache.get(key)
+        if table is None:
+            # 活动卡池（权重从config读取，与展示一致）；顺序与原逐项累加一致
+            tiers = []
+            cum_weights = []
+            total = 0
+            for bit, tier, weight in ((1, "event", key[1]), (2, "gold", key[2]),
+                                      (4, "purple", key[3]), (8, "blue", key[4])):
+                if mask & bit:
+                    total += max(1, int(weight or 1))
+                    tiers.append(tier)
+                    cum_weights.append(total)
+            table = (tiers, cum_weights)
+            if len(self._weight_cache) >= 64:
+                self._weight_cache.clear()
+            self._weight_cache[key] = table
         
-        cumulative = 0
-        for tier, weight in weights.items():
-            cumulative += weight
-            if r <= cumulative:
-                return tier
-        
-        # 兜底：浮点精度问题时返回最后一个
-        return list(weights.keys())[-1]
+        tiers, cum_weights = table
+        return random.choices(tiers, cum_weights=cum_weights)[0]
     
     def can_draw_lottery(self, qq: str) -> Tuple[bool, str]:
         """检查用户是否可以抽奖（仅用于UI展示，实际抽奖使用try_lottery_draw_atomic）"""
-        with self._lock:
+        with self._read_lock:
             config = self.data["lottery_config"]
             now = datetime.now()
-            today = now.date().isoformat()
+            today, this_monday = self._get_date_keys(now)
             
-            if qq not in self.data["user_lottery"]:
+            user_data = self.data["user_lottery"].get(qq)
+            if user_data is None:
                 return True, ""
             
-            user_data = self.data["user_lottery"][qq]
-            
-            # 检查日计数重置
-            if user_data.get("last_draw_date") != today:
-                day_draws = 0
-            else:
-                day_draws = user_data.get("day_draws", 0)
-            
-            # 检查周计数重置
-            week_draws = user_data.get("week_draws", 0)
-            last_draw = user_data.get("last_draw")
-            if last_draw:
-                try:
-                    last_draw_dt = datetime.fromisoformat(last_draw)
-                    last_monday = last_draw_dt - timedelta(days=last_draw_dt.weekday())
-                    this_monday = now - timedelta(days=now.weekday())
-                    if last_monday.date() < this_monday.date():
-                        week_draws = 0
-                except ValueError:
-                    pass
-            
-            # 检查周限制
-            weekly_limit = config.get("weekly_limit", 1)
-            if weekly_limit > 0 and week_draws >= weekly_limit:
-                return False, "本周抽奖次数已用完"
-            
-            # 检查日限制
-            daily_limit = config.get("daily_limit", 0)
-            if daily_limit > 0 and day_draws >= daily_limit:
-                return False, "今日抽奖次数已用完"
-            
-            return True, ""
+            # 与抽奖事务共用同一套周期计数与限制判断
+            week_draws, day_draws = self._period_counts(user_data, today, this_monday)
+            reason = self._limit_reason(config, week_draws, day_draws)
+            return (False, reason) if reason else (True, "")
     
     def get_user_lottery_data(self, qq: str) -> dict:
         """获取用户抽奖数据"""
-        with self._lock:
+        with self._read_lock:
             if qq not in self.data["user_lottery"]:
                 return {
                     "pity_count": 0, "total_draws": 0,
                     "week_draws": 0, "day_draws": 0
                 }
-            return copy.deepcopy(self.data["user_lottery"][qq])
+            return dict(self.data["user_lottery"][qq])
+    
+    def _pool_counts_locked(self) -> dict:
+        """库存数量（调用者已持有锁）"""
+        unused = self._unused
+        return {
+            "gold": len(unused["gold"]),
+            "purple": len(unused["purple"]),
+            "blue": len(unused["blue"]),
+            "event": len(unused["event"]) if self.data["event_pool"]["enabled"] else 0
+        }
     
     def get_all_pool_counts(self) -> dict:
         """获取所有档次的库存数量"""
-        with self._lock:
-            return {
-                "gold": len(self.data["lottery_pool"]["gold"]["unused"]),
-                "purple": len(self.data["lottery_pool"]["purple"]["unused"]),
-                "blue": len(self.data["lottery_pool"]["blue"]["unused"]),
-                "event": len(self.data["event_pool"]["cards"]["unused"]) if self.data["event_pool"]["enabled"] else 0
-            }
+        with self._read_lock:
+            return self._pool_counts_locked()
     
     def get_lottery_config(self) -> dict:
         """获取抽奖配置（副本）"""
-        with self._lock:
-            return copy.deepcopy(self.data["lottery_config"])
+        with self._read_lock:
+            return dict(self.data["lottery_config"])
     
     def update_lottery_config(self, key: str, value) -> bool:
         """更新抽奖配置"""
         with self._lock:
             if key in self.data["lottery_config"]:
                 self.data["lottery_config"][key] = value
-                self._save_atomic()
+                self._mark_dirty()
                 return True
             return False
     
     def get_lottery_history(self, limit: int = 10) -> list:
         """获取抽奖历史"""
-        with self._lock:
-            return copy.deepcopy(self.data["lottery_history"][:limit])
+        # 锁内只取引用快照；历史记录写入后不再修改，锁外逐条浅拷贝
+        with self._read_lock:
+            records = list(islice(self.data["lottery_history"], limit))
+        return [dict(r) for r in records]
     
     # ==================== 活动卡池 ====================
     
+    def _get_event_end_dt(self, end_time: str):
+        """解析活动结束时间（按原始字符串缓存，end_time 不变时不重复解析）
+        
+        返回 (datetime, 是否成功)，与 _parse_naive_datetime 一致
+        """
+        cache = self._event_end_cache
+        if cache[0] != end_time:
+            end_dt, ok = self._parse_naive_datetime(end_time)
+            cache = self._event_end_cache = (end_time, end_dt, ok)
+        return cache[1], cache[2]
+    
     def set_event_pool(self, name: str, end_time: str) -> bool:
         """设置活动卡池"""
         with self._lock:
             self.data["event_pool"]["enabled"] = True
             self.data["event_pool"]["name"] = name
             self.data["event_pool"]["end_time"] = end_time
-            self._save_atomic()
+            self._event_end_cache = ("", None, False)
+            self._mark_dirty()
             return True
     
     def disable_event_pool(self) -> bool:
         """关闭活动卡池"""
         with self._lock:
             self.data["event_pool"]["enabled"] = False
-            self._save_atomic()
+            self._event_end_cache = ("", None, False)
+            self._mark_dirty()
             return True
     
+    def _event_pool_state(self) -> Tuple[bool, bool]:
+        """活动卡池状态（调用者已持有读锁或写锁）
+        
+        Returns:
+            (是否激活, 是否已过期/时间异常而需要关闭)
+        """
+        event_pool = self.data["event_pool"]
+        if not event_pool["enabled"]:
+            return False, False
+        end_time = event_pool["end_time"]
+        if end_time:
+            end_dt, ok = self._get_event_end_dt(end_time)
+            if not ok or datetime.now() > end_dt:
+                return False, True
+        return True, False
+    
     def is_event_pool_active(self) -> bool:
-        """检查活动卡池是否激活"""
+        """检查活动卡池是否激活（读锁判断，只有需要关闭过期活动时才取写锁）"""
+        with self._read_lock:
+            active, expired = self._event_pool_state()
+        if not expired:
+            return active
+        
+        # 取写锁后重新检查：等待期间活动可能已被关闭或重新设置
         with self._lock:
-            if not self.data["event_pool"]["enabled"]:
-                return False
-            
-            end_time = self.data["event_pool"]["end_time"]
-            if end_time:
-                end_dt, ok = self._parse_naive_datetime(end_time)
-                if not ok:
+            active, expired = self._event_pool_state()
+            if expired:
+                end_time = self.data["event_pool"]["end_time"]
+                if not self._get_event_end_dt(end_time)[1]:
                     logger.warning(f"[海梦酱] 活动结束时间格式异常: {end_time}，视为已过期")
-                    self.data["event_pool"]["enabled"] = False
-                    self._save_atomic()
-                    return False
-                if datetime.now() > end_dt:
-                    self.data["event_pool"]["enabled"] = False
-                    self._save_atomic()
-                    return False
-            
-            return True
+                self.data["event_pool"]["enabled"] = False
+                self._mark_dirty()
+            return active
     
     def get_event_pool_info(self) -> dict:
         """获取活动卡池信息"""
-        with self._lock:
+        with self._read_lock:
+            event_pool = self.data["event_pool"]
             return {
-                "enabled": self.data["event_pool"]["enabled"],
-                "name": self.data["event_pool"]["name"],
-                "end_time": self.data["event_pool"]["end_time"],
-                "stock": len(self.data["event_pool"]["cards"]["unused"])
+                "enabled": event_pool["enabled"],
+                "name": event_pool["name"],
+                "end_time": event_pool["end_time"],
+                "stock": len(self._unused["event"])
             }
     
+    def _get_known_codes(self) -> set:
+        """全局码索引：所有池 unused + used 中出现过的码（调用者已持有锁）
+        
+        首次使用时构建，之后随 add_*_codes / 注册增量维护；
+        清空卡池等删除码的操作将其置为 None，下次使用时重建。
+        """
+        if self._known_codes is None:
+            self._ensure_used_loaded()
+            known = set()
+            for pool in self._pools.values():
+                known.update(pool["unused"])
+                known.update(pool["used"])
+            self._known_codes = known
+        return self._known_codes
+    
     def _is_code_globally_used(self, code: str) -> bool:
-        """全局码查重：检查码是否已存在于任何池（调用者已持有锁）"""
-        # 注册码池
-        reg = self.data["registration_codes"]
-        if code in reg["unused"] or code in reg["used"]:
-            return True
-        # 抽奖码池（金/紫/蓝）
-        for tier in ["gold", "purple", "blue"]:
-            pool = self.data["lottery_pool"][tier]
-            if code in pool["unused"] or code in pool["used"]:
-                return True
-        # 活动卡池
-        event = self.data["event_pool"]["cards"]
-        if code in event["unused"] or code in event["used"]:
-            return True
-        return False
+        """全局码查重：检查码是否已存在于任何池（调用者已持有锁，O(1)）"""
+        return code in self._get_known_codes()
     
     def add_event_codes(self, codes: List[str]) -> dict:
         """添加活动卡码（全局去重）"""
         with self._lock:
-            pool = self.data["event_pool"]["cards"]
-            added = 0
-            skipped = 0
-            
-            for code in codes:
-                code = code.strip()
-                if not code:
-                    continue
-                if self._is_code_globally_used(code):
-                    skipped += 1
-                    continue
-                pool["unused"].append(code)
-                added += 1
-            
-            if added > 0:
-                self._save_atomic()
-            
-            return {"added": added, "skipped": skipped}
+            return self._add_codes_locked("event", codes)
     
     # ==================== 码管理 ====================
     
     def add_registration_codes(self, codes: List[str]) -> dict:
         """添加注册码（全局去重）"""
         with self._lock:
-            pool = self.data["registration_codes"]
-            added = 0
-            skipped = 0
-            
-            for code in codes:
-                code = code.strip()
-                if not code:
-                    continue
-                if self._is_code_globally_used(code):
-                    skipped += 1
-                    continue
-                pool["unused"].append(code)
-                added += 1
-            
-            if added > 0:
-                self._save_atomic()
-            
-            return {"added": added, "skipped": skipped}
+            return self._add_codes_locked("registration", codes)
     
     def add_lottery_codes(self, tier: str, codes: List[str]) -> dict:
         """添加抽奖码（全局去重）"""
         with self._lock:
             if tier not in ["gold", "purple", "blue"]:
                 return {"added": 0, "skipped": 0, "error": "无效档次"}
-            
-            pool = self.data["lottery_pool"][tier]
-            added = 0
-            skipped = 0
-            
-            for code in codes:
-                code = code.strip()
-                if not code:
-                    continue
-                if self._is_code_globally_used(code):
-                    skipped += 1
-                    continue
-                pool["unused"].append(code)
-                added += 1
-            
-            if added > 0:
-                self._save_atomic()
-            
-            return {"added": added, "skipped": skipped}
+            return self._add_codes_locked(tier, codes)
+    
+    def _add_codes_locked(self, key: str, codes: List[str]) -> dict:
+        """向指定池追加码并全局去重（调用者已持有写锁）"""
+        known = self._get_known_codes()
+        append = self._unused[key].append
+        added = 0
+        skipped = 0
+        
+        for code in codes:
+            code = code.strip()
+            if not code:
+                continue
+            if code in known:
+                skipped += 1
+                continue
+            append(code)
+            known.add(code)
+            added += 1
+        
+        if added > 0:
+            self._mark_dirty()
+        
+        return {"added": added, "skipped": skipped}
     
     def get_codes_preview(self, pool_type: str, tier: str = None, limit: int = 30) -> List[str]:
         """获取码预览（脱敏）"""
-        with self._lock:
+        with self._read_lock:
             if pool_type == "registration":
-                codes = self.data["registration_codes"]["unused"][:limit]
-            elif pool_type == "lottery" and tier:
-                codes = self.data["lottery_pool"].get(tier, {}).get("unused", [])[:limit]
+                pool = self._unused["registration"]
+            elif pool_type == "lottery" and tier in ("gold", "purple", "blue"):
+                pool = self._unused[tier]
             elif pool_type == "event":
-                codes = self.data["event_pool"]["cards"]["unused"][:limit]
+                pool = self._unused["event"]
             else:
                 return []
-            
-            # 脱敏：显示前4后2，中间*
-            result = []
-            for code in codes:
-                if len(code) > 8:
-                    result.append(code[:4] + "****" + code[-2:])
-                else:
-                    result.append(code[:2] + "****")
-            return result
+            # 锁内只取前 limit 个码的快照，脱敏在锁外完成
+            codes = list(islice(pool, limit))
+        
+        # 脱敏：显示前4后2，中间*
+        return [f"{c[:4]}****{c[-2:]}" if len(c) > 8 else f"{c[:2]}****" for c in codes]
     
     # ==================== 黑名单 ====================
     
     def is_blacklisted(self, qq: str) -> bool:
         """检查是否在黑名单"""
-        with self._lock:
-            blacklist = self.data["blacklist"]
-            if isinstance(blacklist, list):
-                blacklist = set(blacklist)
-                self.data["blacklist"] = blacklist
-            return qq in blacklist
+        with self._blacklist_lock:
+            return qq in self.data["blacklist"]
     
     def add_to_blacklist(self, qq: str) -> bool:
         """添加到黑名单"""
-        with self._lock:
-            if isinstance(self.data["blacklist"], list):
-                self.data["blacklist"] = set(self.data["blacklist"])
+        with self._blacklist_lock:
             self.data["blacklist"].add(qq)
-            self._save_atomic()
+            self._bl_epoch += 1
+            self._mark_dirty()
             return True
     
     def remove_from_blacklist(self, qq: str) -> bool:
         """从黑名单移除"""
-        with self._lock:
-            if isinstance(self.data["blacklist"], list):
-                self.data["blacklist"] = set(self.data["blacklist"])
+        with self._blacklist_lock:
             self.data["blacklist"].discard(qq)
-            self._save_atomic()
+            self._bl_epoch += 1
+            self._mark_dirty()
             return True
     
-    def get_blacklist(self) -> List[str]:
-        """获取黑名单列表"""
-        with self._lock:
-            blacklist = self.data["blacklist"]
-            if isinstance(blacklist, set):
-                return list(blacklist)
-            return list(blacklist) if blacklist else []
+    def get_blacklist(self) -> Tuple[str, ...]:
+        """获取黑名单（有序只读元组，未修改时重复调用直接返回缓存）"""
+        with self._blacklist_lock:
+            cache, epoch = self._bl_cache
+            if epoch == self._bl_epoch:
+                return cache
+            snap = tuple(sorted(self.data["blacklist"]))
+            self._bl_cache = (snap, self._bl_epoch)
+            return snap
     
     def clear_blacklist(self) -> bool:
         """清空黑名单"""
-        with self._lock:
+        with self._blacklist_lock:
             self.data["blacklist"] = set()
-            self._save_atomic()
+            self._bl_epoch += 1
+            self._mark_dirty()
             return True
     
     # ==================== 公告 ====================
     
-    def get_announcement(self) -> dict:
-        """获取公告"""
-        with self._lock:
-            return copy.deepcopy(self.data.get("announcement", {"content": "", "time": ""}))
+    def get_announcement(self) -> Mapping[str, str]:
+        """获取公告（只读视图；公告只整体替换、不原地修改，视图即快照）"""
+        with self._read_lock:
+            announcement = self.data.get("announcement")
+        return MappingProxyType(announcement) if announcement else _EMPTY_ANNOUNCEMENT
     
     def set_announcement(self, content: str) -> bool:
         """设置公告"""
         with self._lock:
             self.data["announcement"] = {
                 "content": content,
-                "time": datetime.now().isoformat()
+                "time": _now_iso()
             }
-            self._save_atomic()
+            self._mark_dirty()
             return True
     
     def clear_announcement(self) -> bool:
         """清空公告"""
         with self._lock:
             self.data["announcement"] = {"content": "", "time": ""}
-            self._save_atomic()
+            self._mark_dirty()
             return True
     
     # ==================== 用户管理 ====================
     
     def get_registered_users_count(self) -> int:
         """获取注册用户数"""
-        with self._lock:
+        with self._read_lock:
             return len(self.data["registered_users"])
     
     def get_registered_users_list(self, limit: int = 50) -> List[Tuple[str, dict]]:
         """获取注册用户列表"""
-        with self._lock:
-            items = list(self.data["registered_users"].items())[:limit]
-            return [(qq, copy.deepcopy(info)) for qq, info in items]
+        with self._read_lock:
+            items = list(islice(self.data["registered_users"].items(), limit))
+        return [(qq, dict(info)) for qq, info in items]
     
     def get_all_registered_users(self) -> List[Tuple[str, dict]]:
         """获取全部注册用户列表（用于导出，无数量限制）"""
-        with self._lock:
+        with self._read_lock:
             items = list(self.data["registered_users"].items())
-            return [(qq, copy.deepcopy(info)) for qq, info in items]
+        return [(qq, dict(info)) for qq, info in items]
     
     def import_registered_users(self, qq_list: List[str]) -> dict:
         """批量导入已注册用户（标记为已注册，不消耗注册码）"""
         with self._lock:
             added = 0
             skipped = 0
-            now = datetime.now().isoformat()
+            now = _now_iso()
+            users = self.data["registered_users"]
             
             for qq in qq_list:
                 qq = qq.strip()
                 if not qq:
                     continue
-                if qq in self.data["registered_users"]:
+                # setdefault 一次查找完成 判重 + 插入
+                entry = {"reg_code": "已导入", "reg_time": now}
+                if users.setdefault(qq, entry) is entry:
+                    added += 1
+                else:
                     skipped += 1
-                    continue
-                self.data["registered_users"][qq] = {
-                    "reg_code": "已导入",
-                    "reg_time": now
-                }
-                added += 1
             
             if added > 0:
-                self._save_atomic()
+                self._mark_dirty()
             
             return {"added": added, "skipped": skipped}
     
     def reset_user_registration(self, qq: str) -> bool:
         """重置用户注册（保留 used 占用防止一码多发，标记 revoked）"""
         with self._lock:
-            if qq in self.data["registered_users"]:
-                user_info = self.data["registered_users"][qq]
-                reg_code = user_info.get("reg_code")
-                
-                # 不删除 used 记录，而是标记 revoked 防止码被重新入库
-                if reg_code and reg_code in self.data["registration_codes"]["used"]:
-                    self.data["registration_codes"]["used"][reg_code]["revoked"] = True
-                
-                del self.data["registered_users"][qq]
-                self._save_atomic()
-                return True
-            return False
+            user_info = self.data["registered_users"].pop(qq, None)
+            if user_info is None:
+                return False
+            reg_code = user_info.get("reg_code")
+            
+            # 不删除 used 记录，而是标记 revoked 防止码被重新入库
+            self._ensure_used_loaded()
+            reg_used = self.data["registration_codes"]["used"]
+            old_entry = reg_used.get(reg_code) if reg_code else None
+            if old_entry is not None:
+                self._record_used("registration", self.data["registration_codes"], reg_code,
+                                  dict(old_entry, revoked=True))
+            
+            self._mark_dirty()
+            return True
     
     def clear_lottery_pool(self, include_event: bool = True) -> dict:
         """一键清除所有抽奖卡池未使用的兑换码"""
         with self._lock:
             cleared = {}
             for tier in ["gold", "purple", "blue"]:
-                count = len(self.data["lottery_pool"][tier]["unused"])
-                self.data["lottery_pool"][tier]["unused"] = []
+                unused = self._unused[tier]
+                count = len(unused)
+                unused.clear()
                 cleared[tier] = count
             
             if include_event:
-                count = len(self.data["event_pool"]["cards"]["unused"])
-                self.data["event_pool"]["cards"]["unused"] = []
+                unused = self._unused["event"]
+                count = len(unused)
+                unused.clear()
                 cleared["event"] = count
             
-            self._save_atomic()
+            # 被清除的码可重新入库，索引失效
+            self._known_codes = None
+            
+            self._mark_dirty()
             return cleared
     
     def reset_user_lottery_data(self, qq: str) -> bool:
         """重置用户抽奖数据"""
         with self._lock:
-            if qq in self.data["user_lottery"]:
-                self.data["user_lottery"][qq] = {
-                    "pity_count": 0, "total_draws": 0,
-                    "week_draws": 0, "day_draws": 0,
-                    "last_draw": "", "last_draw_date": ""
-                }
-                self._save_atomic()
-                return True
-            return False
+            user_lottery = self.data["user_lottery"]
+            old = user_lottery.get(qq)
+            if old is None:
+                return False
+            self._total_draws -= old.get("total_draws", 0)
+            user_lottery[qq] = {
+                "pity_count": 0, "total_draws": 0,
+                "week_draws": 0, "day_draws": 0,
+                "last_draw": "", "last_draw_date": ""
+            }
+            self._mark_dirty()
+            return True
     
     # ==================== 日志（脱敏） ====================
     
     def log_action(self, action: str, qq: str, detail: str = ""):
-        """记录操作日志（脱敏处理）"""
-        with self._lock:
-            # 脱敏：移除可能的码明文
-            safe_detail = detail
-            if len(detail) > 20:
-                # 可能包含码，截断
-                safe_detail = detail[:15] + "..."
-            
-            log_entry = {
-                "time": datetime.now().isoformat(),
-                "action": action,
-                "qq": qq,
-                "detail": safe_detail
-            }
-            self.data["logs"].insert(0, log_entry)
-            self.data["logs"] = self.data["logs"][:500]
-            
-            # 审计日志即时落盘，防止异常退出丢失
-            self._save_atomic()
+        """记录操作日志（脱敏处理；只持日志分区锁）"""
+        self._log_action_locked(action, qq, detail)
+    
+    def _log_action_locked(self, action: str, qq: str, detail: str = ""):
+        """记录操作日志（可在持有写锁时调用，内部只获取日志分区锁）"""
+        # 脱敏：过长的详情可能包含码，截断
+        safe_detail = f"{detail[:15]}..." if len(detail) > 20 else detail
+        
+        log_entry = {
+            "time": _now_iso(),
+            "action": sys.intern(action),  # 操作名种类很少，驻留后各条日志共享同一对象
+            "qq": qq,
+            "detail": safe_detail
+        }
+        with self._logs_lock:
+            self.data["logs"].appendleft(log_entry)
+        
+        # 审计日志批量落盘：只打脏标记不唤醒写入线程，
+        # 由定时检查（最长 LOG_FLUSH_INTERVAL 秒）或下一次普通修改一并写入，退出时 atexit 兜底
+        self._dirty = True
+        self.version = next(self._version_counter)
     
     def get_logs(self, limit: int = 50) -> List[dict]:
         """获取日志"""
-        with self._lock:
-            return copy.deepcopy(self.data["logs"][:limit])
+        with self._logs_lock:
+            entries = list(islice(self.data["logs"], limit))
+        return [dict(e) for e in entries]
     
     # ==================== 统计 ====================
     
     def get_statistics(self) -> dict:
         """获取统计数据"""
-        with self._lock:
-            pools = self.get_all_pool_counts()
+        with self._read_lock:
+            pools = self._pool_counts_locked()
             
-            # 统计抽奖次数
-            tier_counts = {"gold": 0, "purple": 0, "blue": 0, "event": 0}
-            for record in self.data["lottery_history"]:
-                tier = record.get("tier", "")
-                if tier in tier_counts:
-                    tier_counts[tier] += 1
+            # 抽奖次数由计数器增量维护，无需扫描历史与用户表
+            tier_counts = dict(self._tier_counts)
             
             return {
                 "registered_users": len(self.data["registered_users"]),
                 "registration_codes": {
-                    "unused": len(self.data["registration_codes"]["unused"]),
-                    "used": len(self.data["registration_codes"]["used"])
+                    "unused": len(self._unused["registration"]),
+                    "used": self._used_count_locked("registration")
                 },
                 "lottery_pool": pools,
                 "lottery_counts": tier_counts,
                 "blacklist_count": len(self.data["blacklist"]),
-                "total_lottery_draws": sum(
-                    u.get("total_draws", 0) 
-                    for u in self.data["user_lottery"].values()
-                )
+                "total_lottery_draws": self._total_draws
             }
     
     # ==================== 每周重置 ====================
@@ -1060,10 +1691,11 @@ class DataManager:
     def weekly_reset(self):
         """每周重置"""
         with self._lock:
-            for qq in self.data["user_lottery"]:
-                self.data["user_lottery"][qq]["week_draws"] = 0
+            for info in self.data["user_lottery"].values():
+                info["week_draws"] = 0
             
             self.data["weekly_claims"] = {}
-            self._save_atomic()
+            # 每周重置幂等，断电丢失本次写入可再次执行，无需 fsync
+            self._mark_dirty(durable=False)
             
-            self.log_action("系统", "AUTO", "每周重置完成")
+            self._log_action_locked("系统", "AUTO", "每周重置完成")
@@ -1,14 +1,76 @@
 # -*- coding: utf-8 -*-
 """管理员消息处理模块"""
 
-from typing import Optional, List, Union
+import os
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional, List, Tuple, Union
 from datetime import datetime
+from itertools import islice
 
 from ..config import ConfigManager
 from ..data import DataManager
 from ..utils.session import SessionManager
 from ..utils.templates import Templates
-from ..lottery.engine import TIER_INFO
+from ..lottery.engine import TIER_INFO, TierInfo
+
+# 库存查看时注册码池的展示信息（与档次信息同构）
+_REGISTRATION_INFO = TierInfo("注册码", "📋", "")
+
+# 消息分隔线
+_SEPARATOR = "━━━━━━━━━━━━━━━━━"
+
+# 星期名 -> weekday 编号
+_WEEKDAY_MAP = {"周一": 0, "周二": 1, "周三": 2, "周四": 3, "周五": 4, "周六": 5, "周日": 6}
+
+# 添加抽奖码时的档次选择：G/P/B/E -> (档次, 提示模板)
+_TIER_SELECT = {
+    "G": ("gold", Templates.ADMIN_ADD_GOLD),
+    "P": ("purple", Templates.ADMIN_ADD_PURPLE),
+    "B": ("blue", Templates.ADMIN_ADD_BLUE),
+    "E": ("event", Templates.ADMIN_ADD_EVENT),
+}
+
+# 库存查看命令 -> 池
+_STOCK_TIERS = {"3-G": "gold", "3-P": "purple", "3-B": "blue", "3-R": "registration"}
+
+# 抽奖配置命令 -> (配置项, 最小值, 显示名)
+_LOTTERY_CFG_FIELDS = {
+    "10-G": ("gold_weight", 1, "金卡权重"),
+    "10-P": ("purple_weight", 1, "紫卡权重"),
+    "10-B": ("blue_weight", 1, "蓝卡权重"),
+    "10-T": ("pity_threshold", 1, "保底阈值"),
+    "10-W": ("weekly_limit", 0, "每周限制"),
+    "10-D": ("daily_limit", 0, "每日限制"),
+    "10-E": ("event_weight", 1, "活动卡权重"),
+}
+
+# 快捷添加码命令前缀 -> 池（按前缀匹配，首行之后为码）
+_QUICK_ADD_CMDS = (
+    ("jiu注册", "registration"),
+    ("jiu金卡", "gold"),
+    ("jiu紫卡", "purple"),
+    ("jiu蓝卡", "blue"),
+    ("jiu活动卡", "event"),
+)
+
+# 带 QQ 参数的快捷命令前缀 -> (转发的子菜单命令, 缺参时的格式提示)
+_QUICK_TARGET_CMDS = (
+    ("jiu用户", "4-2", "❌ 格式: jiu用户 QQ号"),
+    ("jiu重置", "4-3", "❌ 格式: jiu重置 QQ号"),
+    ("jiu黑名单", "6-1", "❌ 格式: jiu黑名单 QQ号"),
+    ("jiu解黑", "6-2", "❌ 格式: jiu解黑 QQ号"),
+)
+
+
+def _split_codes(lines: Iterable[str]) -> Tuple[List[str], int]:
+    """逐行去空白并保序去重；返回 (码列表, 批内重复数)
+
+    批内重复在这里直接剔除，计入"跳过重复"，DataManager 只需对库内已有码去重
+    """
+    raw = [line.strip() for line in lines]
+    raw = [code for code in raw if code]
+    codes = list(dict.fromkeys(raw))
+    return codes, len(raw) - len(codes)
 
 
 class AdminHandler:
@@ -21,62 +83,181 @@ class AdminHandler:
         self.session = session
         self.lottery = lottery_engine
         self.group_manager = group_manager  # 群成员管理器
+        
+        self._states = self._build_states()
+        # 菜单渲染缓存：菜单名 -> ((数据版本, 配置版本), 文本)；数据与配置都未变时直接复用
+        self._menu_cache = {}
+        
+        # 主菜单跳转表（绑定方法，实例化时构建一次）
+        # 编号 -> (进入的状态 / None=纯展示并清除会话, 展示函数(qq))
+        self._menu_actions = {
+            "0": (None, lambda qq: Templates.ADMIN_HELP),
+            "1": ("add_reg_codes", lambda qq: self.ADD_REG_CODES_PROMPT),
+            "2": ("select_lottery_tier", lambda qq: Templates.ADMIN_ADD_LOTTERY_SELECT),
+            "3": ("stock_menu", lambda qq: self._show_stock_menu()),
+            "4": ("user_menu", lambda qq: self._show_user_menu()),
+            "5": (None, lambda qq: self._show_statistics()),
+            "6": ("blacklist_menu", lambda qq: self._show_blacklist_menu()),
+            "7": ("time_menu", lambda qq: self._show_time_menu()),
+            "8": ("announcement_menu", self._show_announcement_menu),
+            "9": (None, lambda qq: self._show_status()),
+            "10": ("lottery_config_menu", lambda qq: self._show_lottery_config()),
+            "11": ("event_menu", lambda qq: self._show_event_pool_menu()),  # 活动卡池管理
+        }
+        # 快捷操作跳转表：编号前缀（"-" 之前的部分）-> 处理函数(qq, choice, lines)
+        self._prefix_actions = {
+            "3": lambda qq, choice, lines: self._handle_stock_action(qq, choice),
+            "4": self._handle_user_action,
+            "6": lambda qq, choice, lines: self._handle_blacklist_action(choice, lines),
+            "7": lambda qq, choice, lines: self._handle_time_action(choice, lines),
+            "8": lambda qq, choice, lines: self._handle_announcement_action(qq, choice),
+            "10": lambda qq, choice, lines: self._handle_lottery_config_action(choice, lines),
+            "E": lambda qq, choice, lines: self._handle_event_pool_action(choice, lines),
+        }
+        # 快捷命令精确匹配表：命令 -> 处理函数(qq)
+        self._quick_actions = {
+            "jiu状态": lambda qq: self._show_status(),
+            "jiu库": lambda qq: self._show_stock_menu(),
+            "jiu统计": lambda qq: self._show_statistics(),
+            "jiu帮助": lambda qq: Templates.ADMIN_HELP,
+            "jiu记录": lambda qq: self.lottery.get_history_message(20),
+            "jiu健康": lambda qq: self._show_health(),
+            "jiu开启": lambda qq: self._set_enabled(True),
+            "jiu关闭": lambda qq: self._set_enabled(False),
+            "jiu测试": lambda qq: self._toggle_test_mode(),
+            "jiu导出": lambda qq: self._export_users(),
+            "jiu公告": self._enter_announcement_menu,
+        }
+        # 带参数的快捷命令（前缀匹配，按顺序扫描一次）：前缀 -> 处理函数(参数, qq, lines)
+        self._quick_prefix_actions = [
+            (prefix, self._quick_forward(code, usage)) for prefix, code, usage in _QUICK_TARGET_CMDS
+        ]
+        self._quick_prefix_actions.append(("jiu时间", self._quick_set_time))
+    
+    ADD_REG_CODES_PROMPT = """📋 【添加注册码】
+
+请回复要添加的注册码
+每行一个，支持批量添加
+
+回复 Q 取消操作"""
     
     # ==================== 菜单层级导航 ====================
     # D=回退一级  D2=回退两级  Q=返回主菜单  不输入=保活留在当前菜单
     
-    STATE_PARENT = {
-        "admin_menu": None,
-        "stock_menu": "admin_menu",
-        "user_menu": "admin_menu",
-        "blacklist_menu": "admin_menu",
-        "time_menu": "admin_menu",
-        "announcement_menu": "admin_menu",
-        "lottery_config_menu": "admin_menu",
-        "event_menu": "admin_menu",
-        "add_reg_codes": "admin_menu",
-        "select_lottery_tier": "admin_menu",
-        "set_announcement": "announcement_menu",
-        "import_users": "user_menu",
-        # _viewed 状态：执行子命令后进入，D 回退到对应菜单
-        "stock_menu_viewed": "stock_menu",
-        "user_menu_viewed": "user_menu",
-        "blacklist_menu_viewed": "blacklist_menu",
-        "time_menu_viewed": "time_menu",
-        "announcement_menu_viewed": "announcement_menu",
-        "lottery_config_menu_viewed": "lottery_config_menu",
-        "event_menu_viewed": "event_menu",
+    # 子菜单允许的命令前缀与无效输入提示（一个状态只需一次前缀比较）
+    _STATE_PREFIX = {
+        "stock_menu": "3-",
+        "user_menu": "4-",
+        "blacklist_menu": "6-",
+        "time_menu": "7-",
+        "announcement_menu": "8-",
+        "lottery_config_menu": "10-",
+        "event_menu": "E-",
     }
+    _STATE_HINT = {
+        "stock_menu": "3-G/P/B/R/C",
+        "user_menu": "4-1/2/3/4/5/6",
+        "blacklist_menu": "6-1/2/3 QQ号",
+        "time_menu": "7-1 周X 或 7-2 小时",
+        "announcement_menu": "8-1 设置公告 或 8-2 清空",
+        "lottery_config_menu": "10-G/P/B/T/W/D 数值",
+        "event_menu": "E-1/E-2/E-3",
+    }
+    
+    def _build_states(self) -> dict:
+        """构建菜单状态机表：状态 -> (上级状态, 展示函数(qq), 处理函数(qq, message, upper_msg, lines))
+        
+        导航（D/D2）、菜单展示、会话消息处理共用这一张表；
+        add_lottery_* 为动态状态，由各查询函数单独处理。
+        """
+        def submenu(menu: str, action, inputs: dict = None):
+            """子菜单处理：匹配编号前缀则执行并进入 _viewed 状态（保活），否则提示
+            
+            inputs: 进入输入态的命令 -> (输入状态, 提示文本)
+            """
+            viewed = f"{menu}_viewed"
+            prefix = self._STATE_PREFIX[menu]
+            error = f"❌ 无效操作，请使用 {self._STATE_HINT[menu]}\n\n💡 D=返回上级 Q=返回主菜单"
+            
+            def handler(qq, message, upper_msg, lines):
+                if upper_msg.startswith(prefix):
+                    entry = inputs.get(upper_msg) if inputs else None
+                    if entry:
+                        self.session.set(qq, entry[0], is_admin=True)
+                        return entry[1]
+                    self.session.set(qq, viewed, is_admin=True)
+                    return action(qq, message, lines)
+                return error
+            return handler
+        
+        def input_state(back: str, action):
+            """输入状态处理：完成后回到上级菜单（action(message, lines)，lines 为 handle() 中已拆好的行）"""
+            def handler(qq, message, upper_msg, lines):
+                self.session.set(qq, back, is_admin=True)
+                return action(message, lines)
+            return handler
+        
+        states = {
+            "admin_menu": (None, lambda qq: Templates.ADMIN_MENU, None),
+            # ========== 输入状态（完成后回到上级）==========
+            "add_reg_codes": ("admin_menu", None, input_state(
+                "admin_menu", lambda message, lines: self._add_codes(lines, "registration"))),
+            "select_lottery_tier": ("admin_menu", lambda qq: Templates.ADMIN_ADD_LOTTERY_SELECT,
+                                    lambda qq, message, upper_msg, lines: self._handle_tier_select(qq, upper_msg)),
+            "set_announcement": ("announcement_menu", None, input_state(
+                "announcement_menu", lambda message, lines: self._set_announcement(message))),
+            "import_users": ("user_menu", None, input_state(
+                "user_menu", lambda message, lines: self._import_users(lines))),
+        }
+        
+        # ========== 子菜单状态（保活 + 执行后进入 _viewed 状态，D 回退到对应菜单）==========
+        submenus = [
+            ("stock_menu", lambda qq: self._show_stock_menu(),
+             lambda qq, message, lines: self._handle_stock_action(qq, message)),
+            ("user_menu", lambda qq: self._show_user_menu(), self._handle_user_action,
+             {"4-5": ("import_users", self.IMPORT_USERS_PROMPT)}),
+            ("blacklist_menu", lambda qq: self._show_blacklist_menu(),
+             lambda qq, message, lines: self._handle_blacklist_action(message, lines)),
+            ("time_menu", lambda qq: self._show_time_menu(),
+             lambda qq, message, lines: self._handle_time_action(message, lines)),
+            ("announcement_menu", self._show_announcement_menu,
+             lambda qq, message, lines: self._handle_announcement_action(qq, message)),
+            ("lottery_config_menu", lambda qq: self._show_lottery_config(),
+             lambda qq, message, lines: self._handle_lottery_config_action(message, lines)),
+            ("event_menu", lambda qq: self._show_event_pool_menu(),
+             lambda qq, message, lines: self._handle_event_pool_action(message, lines)),
+        ]
+        for menu, display, action, *inputs in submenus:
+            handler = submenu(menu, action, *inputs)
+            states[menu] = ("admin_menu", display, handler)
+            states[f"{menu}_viewed"] = (menu, None, handler)
+        return states
+    
+    def _render_cached(self, name: str, render) -> str:
+        """按 (数据版本, 配置版本) 缓存菜单文本，仅用于只依赖数据与配置的展示"""
+        key = (self.data.version, self.config.version)
+        cached = self._menu_cache.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+        text = render()
+        self._menu_cache[name] = (key, text)
+        return text
     
     def _get_parent_state(self, state: str) -> Optional[str]:
         """获取上级菜单状态"""
         if state and state.startswith("add_lottery_"):
             return "select_lottery_tier"
-        return self.STATE_PARENT.get(state)
+        entry = self._states.get(state)
+        return entry[0] if entry else None
     
     def _get_menu_display(self, qq: str, state: str) -> str:
         """获取指定菜单状态的展示文本"""
-        if state == "admin_menu":
-            return Templates.ADMIN_MENU
-        elif state == "stock_menu":
-            return self._show_stock_menu()
-        elif state == "user_menu":
-            return self._show_user_menu()
-        elif state == "blacklist_menu":
-            return self._show_blacklist_menu()
-        elif state == "time_menu":
-            return self._show_time_menu()
-        elif state == "announcement_menu":
-            return self._show_announcement_menu(qq)
-        elif state == "lottery_config_menu":
-            return self._show_lottery_config()
-        elif state == "event_menu":
-            return self._show_event_pool_menu()
-        elif state == "select_lottery_tier":
-            return Templates.ADMIN_ADD_LOTTERY_SELECT
+        entry = self._states.get(state)
+        if entry and entry[1]:
+            return entry[1](qq)
         return Templates.ADMIN_MENU
     
-    async def handle(self, qq: str, message: str) -> Optional[Union[str, List[str]]]:
+    async def handle(self, qq: str, message: str) -> Optional[Union[str, AsyncIterator[str]]]:
         """处理管理员消息"""
         lines = message.split('\n')
         cmd = lines[0].strip()
@@ -89,71 +270,59 @@ class AdminHandler:
         # 检查会话状态
         session = self.session.get(qq, is_admin=True)
         if session:
-            state = session.get("state")
-            context = session.get("context", {})
+            state = session.state
+            context = session.context
             upper_msg = message.upper().strip()
             
-            # Q = 返回主菜单
-            if upper_msg == "Q":
-                self.session.set(qq, "admin_menu", is_admin=True)
-                return "↩️ 已返回主菜单\n\n" + Templates.ADMIN_MENU
-            
-            # D = 回退一级
-            if upper_msg == "D":
-                parent = self._get_parent_state(state)
-                if parent:
-                    self.session.set(qq, parent, is_admin=True)
-                    return "↩️ 已返回上级\n\n" + self._get_menu_display(qq, parent)
-                return "📍 已在主菜单，无法继续回退"
-            
-            # D2 = 回退两级
-            if upper_msg == "D2":
-                parent = self._get_parent_state(state)
-                grand = self._get_parent_state(parent) if parent else None
-                target = grand or parent or "admin_menu"
-                self.session.set(qq, target, is_admin=True)
-                return "↩️ 已返回\n\n" + self._get_menu_display(qq, target)
+            # 导航命令最长两字符，长输入直接跳过 Q/D/D2 判断
+            if len(upper_msg) <= 2:
+                # Q = 返回主菜单
+                if upper_msg == "Q":
+                    self.session.set(qq, "admin_menu", is_admin=True)
+                    return "↩️ 已返回主菜单\n\n" + Templates.ADMIN_MENU
+                
+                # D = 回退一级
+                if upper_msg == "D":
+                    parent = self._get_parent_state(state)
+                    if parent:
+                        self.session.set(qq, parent, is_admin=True)
+                        return "↩️ 已返回上级\n\n" + self._get_menu_display(qq, parent)
+                    return "📍 已在主菜单，无法继续回退"
+                
+                # D2 = 回退两级
+                if upper_msg == "D2":
+                    parent = self._get_parent_state(state)
+                    grand = self._get_parent_state(parent) if parent else None
+                    target = grand or parent or "admin_menu"
+                    self.session.set(qq, target, is_admin=True)
+                    return "↩️ 已返回\n\n" + self._get_menu_display(qq, target)
             
             # 处理各种会话状态
-            return await self._handle_session_state(qq, message, lines, state, context)
+            return await self._handle_session_state(qq, message, upper_msg, lines, state, context)
         
         # 不在会话中，尝试处理快捷命令
         return await self._handle_quick_command(qq, message, lines)
     
-    async def _handle_session_state(self, qq: str, message: str, lines: List[str], state: str, context: dict) -> Optional[Union[str, List[str]]]:
-        """处理会话状态（保活：操作后留在当前菜单，输入态回到上级）"""
+    async def _handle_session_state(self, qq: str, message: str, upper_msg: str, lines: List[str],
+                                    state: str, context: dict) -> Optional[Union[str, AsyncIterator[str]]]:
+        """处理会话状态（保活：操作后留在当前菜单，输入态回到上级）
+        
+        upper_msg 为 handle() 中算好的 message.upper().strip()，各分支复用，不再重复转换
+        """
         if state == "admin_menu":
-            return await self._handle_menu_choice(qq, message, lines)
+            return await self._handle_menu_choice(qq, message, upper_msg, lines)
         
-        # ========== 输入状态（完成后回到上级）==========
-        elif state == "add_reg_codes":
-            self.session.set(qq, "admin_menu", is_admin=True)
-            return self._add_codes(message, "registration")
-        elif state == "select_lottery_tier":
-            return self._handle_tier_select(qq, message)
-        elif state.startswith("add_lottery_"):
-            tier = state.replace("add_lottery_", "")
+        if state.startswith("add_lottery_"):
+            tier = state[len("add_lottery_"):]
             self.session.set(qq, "admin_menu", is_admin=True)
-            return self._add_lottery_codes(message, tier)
-        elif state == "set_announcement":
-            self.session.set(qq, "announcement_menu", is_admin=True)
-            return self._set_announcement(message)
-        elif state == "import_users":
-            self.session.set(qq, "user_menu", is_admin=True)
-            return self._import_users(message)
-
-        # ========== 子菜单状态（保活 + 执行后进入 _viewed 状态）==========
-        elif state in ("stock_menu", "stock_menu_viewed"):
-            if message.upper().startswith("3-"):
-                self.session.set(qq, "stock_menu_viewed", is_admin=True)
-                return self._handle_stock_action(qq, message)
-            return "❌ 无效操作，请使用 3-G/P/B/R/C\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        elif state in ("user_menu", "user_menu_viewed"):
-            if message.upper().startswith("4-"):
-                if message.upper() == "4-5":
-                    self.session.set(qq, "import_users", is_admin=True)
-                    return """📥 【导入已注册用户】
+            return self._add_lottery_codes(lines, tier)
+        
+        entry = self._states.get(state)
+        if entry and entry[2]:
+            return entry[2](qq, message, upper_msg, lines)
+        return None
+    
+    IMPORT_USERS_PROMPT = """📥 【导入已注册用户】
 
 请回复要导入的 QQ 号列表
 每行一个 QQ 号
@@ -161,137 +330,53 @@ class AdminHandler:
 导入后这些用户将无法再领取注册码
 
 💡 D=返回上级 Q=返回主菜单"""
-                self.session.set(qq, "user_menu_viewed", is_admin=True)
-                return self._handle_user_action(qq, message, lines)
-            return "❌ 无效操作，请使用 4-1/2/3/4/5/6\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        elif state in ("blacklist_menu", "blacklist_menu_viewed"):
-            if message.upper().startswith("6-"):
-                self.session.set(qq, "blacklist_menu_viewed", is_admin=True)
-                return self._handle_blacklist_action(message, lines)
-            return "❌ 无效操作，请使用 6-1/2/3 QQ号\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        elif state in ("time_menu", "time_menu_viewed"):
-            if message.upper().startswith("7-"):
-                self.session.set(qq, "time_menu_viewed", is_admin=True)
-                return self._handle_time_action(message, lines)
-            return "❌ 无效操作，请使用 7-1 周X 或 7-2 小时\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        elif state in ("announcement_menu", "announcement_menu_viewed"):
-            if message.upper().startswith("8-"):
-                self.session.set(qq, "announcement_menu_viewed", is_admin=True)
-                return self._handle_announcement_action(qq, message)
-            return "❌ 无效操作，请使用 8-1 设置公告 或 8-2 清空\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        elif state in ("lottery_config_menu", "lottery_config_menu_viewed"):
-            if message.upper().startswith("10-"):
-                self.session.set(qq, "lottery_config_menu_viewed", is_admin=True)
-                return self._handle_lottery_config_action(message, lines)
-            return "❌ 无效操作，请使用 10-G/P/B/T/W/D 数值\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        elif state in ("event_menu", "event_menu_viewed"):
-            if message.upper().startswith("E-"):
-                self.session.set(qq, "event_menu_viewed", is_admin=True)
-                return self._handle_event_pool_action(message, lines)
-            return "❌ 无效操作，请使用 E-1/E-2/E-3\n\n💡 D=返回上级 Q=返回主菜单"
-        
-        return None
     
-    async def _handle_menu_choice(self, qq: str, choice: str, lines: List[str]) -> str:
-        """处理管理员菜单选择"""
+    async def _handle_menu_choice(self, qq: str, choice: str, choice_upper: str, lines: List[str]) -> str:
+        """处理管理员菜单选择（查表分派）"""
         # 不要在这里 clear，子菜单需要自己管理会话
         
-        if choice == "0":
-            self.session.clear(qq, is_admin=True)
-            return Templates.ADMIN_HELP
-        elif choice == "1":
-            self.session.set(qq, "add_reg_codes", is_admin=True)
-            return """📋 【添加注册码】
-
-请回复要添加的注册码
-每行一个，支持批量添加
-
-回复 Q 取消操作"""
-        elif choice == "2":
-            self.session.set(qq, "select_lottery_tier", is_admin=True)
-            return Templates.ADMIN_ADD_LOTTERY_SELECT
-        elif choice == "3":
-            self.session.set(qq, "stock_menu", is_admin=True)
-            return self._show_stock_menu()
-        elif choice == "4":
-            self.session.set(qq, "user_menu", is_admin=True)
-            return self._show_user_menu()
-        elif choice == "5":
-            self.session.clear(qq, is_admin=True)  # 纯展示，可清除
-            return self._show_statistics()
-        elif choice == "6":
-            self.session.set(qq, "blacklist_menu", is_admin=True)
-            return self._show_blacklist_menu()
-        elif choice == "7":
-            self.session.set(qq, "time_menu", is_admin=True)
-            return self._show_time_menu()
-        elif choice == "8":
-            self.session.set(qq, "announcement_menu", is_admin=True)
-            return self._show_announcement_menu(qq)
-        elif choice == "9":
-            self.session.clear(qq, is_admin=True)  # 纯展示，可清除
-            return self._show_status()
-        elif choice == "10":
-            self.session.set(qq, "lottery_config_menu", is_admin=True)
-            return self._show_lottery_config()
-        elif choice == "11":  # 活动卡池管理
-            self.session.set(qq, "event_menu", is_admin=True)
-            return self._show_event_pool_menu()
-        
-        # 快捷操作
-        elif choice.startswith("3-"):
-            return self._handle_stock_action(qq, choice)
-        elif choice.startswith("4-"):
-            return self._handle_user_action(qq, choice, lines)
-        elif choice.startswith("6-"):
-            return self._handle_blacklist_action(choice, lines)
-        elif choice.startswith("7-"):
-            return self._handle_time_action(choice, lines)
-        elif choice.startswith("8-"):
-            return self._handle_announcement_action(qq, choice)
-        elif choice.startswith("10-"):
-            return self._handle_lottery_config_action(choice, lines)
-        elif choice.upper().startswith("E-"):
-            return self._handle_event_pool_action(choice, lines)
-        elif choice.upper() in ["G", "P", "B", "E"]:
-            return self._handle_tier_select(qq, choice)
+        # 菜单项：(进入的状态 / None=纯展示清除会话, 展示函数)
+        entry = self._menu_actions.get(choice)
+        if entry:
+            state, display = entry
+            if state:
+                self.session.set(qq, state, is_admin=True)
+            else:
+                self.session.clear(qq, is_admin=True)
+            return display(qq)
+        
+        # 快捷操作：按 "-" 前的编号查表（E- 不区分大小写）
+        head, sep, _ = choice_upper.partition("-")
+        if sep:
+            action = self._prefix_actions.get(head)
+            if action:
+                return action(qq, choice, lines)
+        elif choice_upper in _TIER_SELECT:
+            return self._handle_tier_select(qq, choice_upper)
         
         self.session.set(qq, "admin_menu", is_admin=True)
         return "❌ 无效选择\n\n" + Templates.ADMIN_MENU
     
-    def _handle_tier_select(self, qq: str, choice: str) -> str:
-        """处理档次选择"""
-        tier_map = {"G": "gold", "P": "purple", "B": "blue", "E": "event"}
-        template_map = {
-            "G": Templates.ADMIN_ADD_GOLD,
-            "P": Templates.ADMIN_ADD_PURPLE,
-            "B": Templates.ADMIN_ADD_BLUE,
-            "E": Templates.ADMIN_ADD_EVENT
-        }
-        
-        choice_upper = choice.upper()
-        if choice_upper in tier_map:
-            tier = tier_map[choice_upper]
+    def _handle_tier_select(self, qq: str, choice_upper: str) -> str:
+        """处理档次选择（choice_upper 为已转大写的选择）"""
+        entry = _TIER_SELECT.get(choice_upper)
+        if entry:
+            tier, template = entry
             self.session.set(qq, f"add_lottery_{tier}", is_admin=True)
-            return template_map[choice_upper]
+            return template
         
         self.session.clear(qq, is_admin=True)
         return "❌ 无效选择"
     
-    def _add_codes(self, message: str, code_type: str) -> str:
-        """添加注册码（通过DataManager公共API）"""
-        codes = [line.strip() for line in message.split('\n') if line.strip()]
+    def _add_codes(self, lines: Iterable[str], code_type: str) -> str:
+        """添加注册码（通过DataManager公共API，lines 为逐行的码）"""
+        codes, dup_count = _split_codes(lines)
         if not codes:
             return "❌ 没有找到有效的码"
         
         result = self.data.add_registration_codes(codes)
         added = result["added"]
-        skipped = result["skipped"]
+        skipped = result["skipped"] + dup_count
         
         self.data.log_action("添加注册码", "ADMIN", f"添加{added}个")
         
@@ -306,15 +391,15 @@ class AdminHandler:
 
 当前库存: {current_stock} 个"""
     
-    def _add_lottery_codes(self, message: str, tier: str) -> str:
-        """添加抽奖码（通过DataManager公共API）"""
-        codes = [line.strip() for line in message.split('\n') if line.strip()]
+    def _add_lottery_codes(self, lines: Iterable[str], tier: str) -> str:
+        """添加抽奖码（通过DataManager公共API，lines 为逐行的码）"""
+        codes, dup_count = _split_codes(lines)
         if not codes:
             return "❌ 没有找到有效的码"
         
-        tier_info = TIER_INFO.get(tier, {})
-        tier_name = tier_info.get("name", tier)
-        tier_icon = tier_info.get("icon", "🎁")
+        tier_info = TIER_INFO.get(tier)
+        tier_name = tier_info.name if tier_info else tier
+        tier_icon = tier_info.icon if tier_info else "🎁"
         
         if tier == "event":
             result = self.data.add_event_codes(codes)
@@ -325,7 +410,7 @@ class AdminHandler:
             return f"❌ {result['error']}"
         
         added = result["added"]
-        skipped = result["skipped"]
+        skipped = result["skipped"] + dup_count
         
         self.data.log_action(f"添加{tier_name}", "ADMIN", f"添加{added}个")
         
@@ -348,6 +433,10 @@ class AdminHandler:
     
     def _show_stock_menu(self) -> str:
         """显示库存菜单（通过DataManager公共API）"""
+        return self._render_cached("stock_menu", self._render_stock_menu)
+    
+    def _render_stock_menu(self) -> str:
+        """渲染库存菜单文本（由 _show_stock_menu 按版本缓存）"""
         stats = self.data.get_statistics()
         pools = stats["lottery_pool"]
         reg_unused = stats["registration_codes"]["unused"]
@@ -395,26 +484,21 @@ class AdminHandler:
     
     def _show_user_menu(self) -> str:
         """显示用户管理菜单（通过DataManager公共API）"""
+        return self._render_cached("user_menu", self._render_user_menu)
+    
+    def _render_user_menu(self) -> str:
+        """渲染用户管理菜单文本（由 _show_user_menu 按版本缓存）"""
         stats = self.data.get_statistics()
         total = stats["registered_users"]
         week_draws = stats.get("total_lottery_draws", 0)
-        
-        return f"""👥 【用户管理】
-
-📊 总注册: {total} 人
-🎰 累计抽奖: {week_draws} 次
-
-━━━━━━━━━━━━━━━━━
-快捷操作:
-回复 4-1 查看用户列表
-回复 4-2 QQ号 查询用户
-回复 4-3 QQ号 重置用户
-回复 4-4 QQ号 清空抽奖数据
-回复 4-5 批量导入用户
-回复 4-6 📤 导出全部用户"""
+        return Templates.ADMIN_USER_MENU.format(total=total, week_draws=week_draws)
     
     def _show_statistics(self) -> str:
         """显示统计（通过DataManager公共API）"""
+        return self._render_cached("statistics", self._render_statistics)
+    
+    def _render_statistics(self) -> str:
+        """渲染统计文本（由 _show_statistics 按版本缓存）"""
         stats = self.data.get_statistics()
         pools = stats["lottery_pool"]
         tier_counts = stats.get("lottery_counts", {"gold": 0, "purple": 0, "blue": 0, "event": 0})
@@ -443,6 +527,10 @@ class AdminHandler:
     
     def _show_blacklist_menu(self) -> str:
         """显示黑名单菜单（通过DataManager公共API）"""
+        return self._render_cached("blacklist_menu", self._render_blacklist_menu)
+    
+    def _render_blacklist_menu(self) -> str:
+        """渲染黑名单菜单文本（由 _show_blacklist_menu 按版本缓存）"""
         blacklist = self.data.get_blacklist()
         
         if not blacklist:
@@ -452,31 +540,11 @@ class AdminHandler:
             if len(blacklist) > 10:
                 list_str += f"\n... 还有 {len(blacklist) - 10} 人"
         
-        return f"""🚫 【黑名单管理】
-
-当前黑名单: {len(blacklist)} 人
-
-{list_str}
-
-━━━━━━━━━━━━━━━━━
-快捷操作:
-回复 6-1 QQ号 添加黑名单
-回复 6-2 QQ号 移除黑名单
-回复 6-3 清空黑名单"""
+        return Templates.ADMIN_BLACKLIST_MENU.format(count=len(blacklist), list_str=list_str)
     
     def _show_time_menu(self) -> str:
         """显示时间设置菜单"""
-        time_str = self.config.get_exchange_time_str()
-        
-        return f"""⏰ 【发放时间设置】
-
-当前设置: {time_str}
-
-━━━━━━━━━━━━━━━━━
-修改设置:
-回复 7-1 星期 设置星期几（如: 7-1 周日）
-回复 7-2 小时 设置几点开始（如: 7-2 9）
-回复 7-3 星期 小时 一键设置（如: 7-3 周日 9）"""
+        return Templates.ADMIN_TIME_MENU.format(time_str=self.config.get_exchange_time_str())
     
     def _show_announcement_menu(self, qq: str) -> str:
         """显示公告管理菜单"""
@@ -489,23 +557,19 @@ class AdminHandler:
         else:
             current = "暂无公告"
         
-        return f"""📢 【公告管理】
-
-当前公告:
-{current}
-
-━━━━━━━━━━━━━━━━━
-快捷操作:
-回复 8-1 设置新公告
-回复 8-2 清空公告"""
+        return Templates.ADMIN_ANNOUNCEMENT_MENU.format(current=current)
     
     def _show_status(self) -> str:
         """显示系统状态"""
+        return self._render_cached("status", self._render_status)
+    
+    def _render_status(self) -> str:
+        """渲染系统状态文本（由 _show_status 按版本缓存）"""
         enabled = self.config.is_enabled()
         test_mode = self.config.is_test_mode()
-        pools = self.data.get_all_pool_counts()
-        
+        # 一次读锁内取全部统计，库存数直接复用 lottery_pool
         stats = self.data.get_statistics()
+        pools = stats["lottery_pool"]
         reg_stock = stats["registration_codes"]["unused"]
         
         return f"""⚙️ 【系统状态】
@@ -526,9 +590,6 @@ class AdminHandler:
     
     def _show_health(self) -> str:
         """显示系统健康状态"""
-        import os
-        from pathlib import Path
-        
         lines = ["🩺 【系统健康检查】\n"]
         
         # 数据文件状态
@@ -580,7 +641,8 @@ class AdminHandler:
         # 含活动卡概率（活动开启时）
         full_total = base_total + event_w
         
-        pity_tier_name = TIER_INFO.get(config.get("pity_tier", "purple"), {}).get("name", "紫卡")
+        pity_info = TIER_INFO.get(config.get("pity_tier", "purple"))
+        pity_tier_name = pity_info.name if pity_info else "紫卡"
         
         base_info = Templates.ADMIN_LOTTERY_CONFIG.format(
             gold_weight=gold_w,
@@ -603,16 +665,14 @@ class AdminHandler:
         if event_active:
             base_info += f"\n   活动开启时概率: {event_percent}%"
         base_info += f"\n回复 10-E 数字 修改活动卡权重"
+        base_info += "\n💡 多项可每行一条，一次发送批量修改"
         return base_info
     
     def _handle_stock_action(self, qq: str, action: str) -> str:
         """处理库存操作（通过DataManager公共API）"""
-        tier_map = {"3-G": "gold", "3-P": "purple", "3-B": "blue", "3-R": "registration"}
-        
         action_upper = action.upper()
-        if action_upper in tier_map:
-            tier = tier_map[action_upper]
-            
+        tier = _STOCK_TIERS.get(action_upper)
+        if tier:
             # 获取真实库存数
             if tier == "registration":
                 stats = self.data.get_statistics()
@@ -623,19 +683,14 @@ class AdminHandler:
                 total_count = pools.get(tier, 0)
                 codes = self.data.get_codes_preview("lottery", tier, limit=30)
             
-            tier_info = TIER_INFO.get(tier, {"name": "注册码", "icon": "📋"})
+            tier_info = TIER_INFO.get(tier, _REGISTRATION_INFO)
             
             if not codes:
-                return f"{tier_info['icon']} 【{tier_info['name']}】库存为空"
+                return f"{tier_info.icon} 【{tier_info.name}】库存为空"
             
-            msg = f"{tier_info['icon']} 【{tier_info['name']}库存】\n总计: {total_count} 个\n\n"
-            for code in codes:
-                msg += f"{code}\n"
-            
-            if total_count > len(codes):
-                msg += f"\n... 仅显示前 {len(codes)} 个（脱敏）"
-            
-            return msg
+            body = "\n".join(codes)
+            tail = f"\n\n... 仅显示前 {len(codes)} 个（脱敏）" if total_count > len(codes) else "\n"
+            return f"{tier_info.icon} 【{tier_info.name}库存】\n总计: {total_count} 个\n\n{body}{tail}"
         
         if action_upper == "3-C":
             cleared = self.data.clear_lottery_pool(include_event=True)
@@ -656,11 +711,10 @@ class AdminHandler:
         
         return "❌ 无效操作"
     
-    def _handle_user_action(self, qq: str, action: str, lines: List[str]) -> Union[str, List[str]]:
+    def _handle_user_action(self, qq: str, action: str, lines: List[str]) -> Union[str, AsyncIterator[str]]:
         """处理用户管理操作（通过DataManager公共API）"""
-        parts = action.split(" ", 1)
-        cmd = parts[0]
-        param = parts[1].strip() if len(parts) > 1 else ""
+        cmd, _, param = action.partition(" ")
+        param = param.strip()
         
         if cmd == "4-1":
             # 获取用户列表
@@ -669,10 +723,8 @@ class AdminHandler:
                 return "📋 暂无注册用户"
             
             stats = self.data.get_statistics()
-            msg = f"📋 【已注册用户】\n共 {stats['registered_users']} 人\n\n"
-            for user_qq, info in users:
-                msg += f"QQ{user_qq}\n"
-            return msg
+            body = "\n".join(f"QQ{user_qq}" for user_qq, _ in users)
+            return f"📋 【已注册用户】\n共 {stats['registered_users']} 人\n\n{body}\n"
         
         elif cmd == "4-2" and param:
             user_qq = param
@@ -714,9 +766,8 @@ class AdminHandler:
 
     def _handle_blacklist_action(self, action: str, lines: List[str]) -> str:
         """处理黑名单操作（通过DataManager公共API）"""
-        parts = action.split(" ", 1)
-        cmd = parts[0]
-        param = parts[1].strip() if len(parts) > 1 else ""
+        cmd, _, param = action.partition(" ")
+        param = param.strip()
         
         if cmd == "6-1" and param:
             self.data.add_to_blacklist(param)
@@ -732,21 +783,19 @@ class AdminHandler:
     
     def _handle_time_action(self, action: str, lines: List[str]) -> str:
         """处理时间设置"""
-        parts = action.split(" ", 2)
-        cmd = parts[0]
+        cmd, has_arg, rest = action.partition(" ")
+        arg1, has_arg2, arg2 = rest.partition(" ")
         
-        weekday_map = {"周一": 0, "周二": 1, "周三": 2, "周四": 3, "周五": 4, "周六": 5, "周日": 6}
-        
-        if cmd == "7-1" and len(parts) > 1:
-            weekday_str = parts[1]
-            if weekday_str in weekday_map:
-                self.config.set("exchange_time.weekday", weekday_map[weekday_str])
+        if cmd == "7-1" and has_arg:
+            weekday_str = arg1
+            if weekday_str in _WEEKDAY_MAP:
+                self.config.set("exchange_time.weekday", _WEEKDAY_MAP[weekday_str])
                 return f"✅ 发放日已设置为: {weekday_str}"
             return "❌ 无效的星期"
         
-        elif cmd == "7-2" and len(parts) > 1:
+        elif cmd == "7-2" and has_arg:
             try:
-                hour = int(parts[1])
+                hour = int(arg1)
                 if 0 <= hour <= 23:
                     self.config.set("exchange_time.hour", hour)
                     return f"✅ 开始时间已设置为: {hour}:00"
@@ -754,12 +803,12 @@ class AdminHandler:
                 pass
             return "❌ 请输入有效的小时数 (0-23)"
         
-        elif cmd == "7-3" and len(parts) > 2:
-            weekday_str = parts[1]
+        elif cmd == "7-3" and has_arg2:
+            weekday_str = arg1
             try:
-                hour = int(parts[2].replace("点", ""))
-                if weekday_str in weekday_map and 0 <= hour <= 23:
-                    self.config.set("exchange_time.weekday", weekday_map[weekday_str])
+                hour = int(arg2.replace("点", ""))
+                if weekday_str in _WEEKDAY_MAP and 0 <= hour <= 23:
+                    self.config.set("exchange_time.weekday", _WEEKDAY_MAP[weekday_str])
                     self.config.set("exchange_time.hour", hour)
                     return f"✅ 发放时间已设置为: 每{weekday_str} {hour}:00 - 24:00"
             except (ValueError, KeyError):
@@ -785,131 +834,102 @@ class AdminHandler:
         return "❌ 无效操作"
     
     def _handle_lottery_config_action(self, action: str, lines: List[str]) -> str:
-        """处理抽奖配置操作（通过DataManager公共API）"""
-        parts = action.split(" ", 1)
-        cmd = parts[0].upper()
-        value = parts[1].strip() if len(parts) > 1 else ""
-        
-        try:
-            num = int(value)
-        except ValueError:
-            return "❌ 请输入有效的数字"
-        
-        if cmd == "10-G":
-            actual = max(1, num)
-            self.data.update_lottery_config("gold_weight", actual)
-            return f"✅ 金卡权重已设置为: {actual}"
-        elif cmd == "10-P":
-            actual = max(1, num)
-            self.data.update_lottery_config("purple_weight", actual)
-            return f"✅ 紫卡权重已设置为: {actual}"
-        elif cmd == "10-B":
-            actual = max(1, num)
-            self.data.update_lottery_config("blue_weight", actual)
-            return f"✅ 蓝卡权重已设置为: {actual}"
-        elif cmd == "10-T":
-            actual = max(1, num)
-            self.data.update_lottery_config("pity_threshold", actual)
-            return f"✅ 保底阈值已设置为: {actual}"
-        elif cmd == "10-W":
-            actual = max(0, num)
-            self.data.update_lottery_config("weekly_limit", actual)
-            return f"✅ 每周限制已设置为: {actual}"
-        elif cmd == "10-D":
-            actual = max(0, num)
-            self.data.update_lottery_config("daily_limit", actual)
-            return f"✅ 每日限制已设置为: {actual}"
-        elif cmd == "10-E":
-            actual = max(1, num)
-            self.data.update_lottery_config("event_weight", actual)
-            return f"✅ 活动卡权重已设置为: {actual}"
-        
-        return "❌ 无效操作"
+        """处理抽奖配置操作（通过DataManager公共API）
+        
+        支持多行一次设置多项（每行一条 10-X 数值）：全部校验通过后在一次 batch 内写入，只落盘一次
+        """
+        multi = len(lines) > 1
+        updates = []
+        for line in (lines if multi else [action]):
+            line = line.strip()
+            if not line:
+                continue
+            where = f"{line}\n" if multi else ""
+            
+            cmd, _, value = line.partition(" ")
+            cmd = cmd.upper()
+            value = value.strip()
+            
+            try:
+                num = int(value)
+            except ValueError:
+                return f"{where}❌ 请输入有效的数字"
+            
+            field = _LOTTERY_CFG_FIELDS.get(cmd)
+            if not field:
+                return f"{where}❌ 无效操作"
+            key, floor, label = field
+            updates.append((key, max(floor, num), label))
+        
+        if not multi:
+            key, actual, label = updates[0]
+            self.data.update_lottery_config(key, actual)
+            return f"✅ {label}已设置为: {actual}"
+        
+        with self.data.batch():
+            for key, actual, _ in updates:
+                self.data.update_lottery_config(key, actual)
+        return "\n".join(f"✅ {label}已设置为: {actual}" for _, actual, label in updates)
     
-    async def _handle_quick_command(self, qq: str, message: str, lines: List[str]) -> Optional[Union[str, List[str]]]:
+    async def _handle_quick_command(self, qq: str, message: str, lines: List[str]) -> Optional[Union[str, AsyncIterator[str]]]:
         """处理快捷命令"""
         cmd = lines[0].strip()
         
-        if cmd == "jiu状态":
-            return self._show_status()
-        elif cmd == "jiu库":
-            return self._show_stock_menu()
-        elif cmd == "jiu统计":
-            return self._show_statistics()
-        elif cmd == "jiu帮助":
-            return Templates.ADMIN_HELP
-        elif cmd == "jiu记录":
-            return self.lottery.get_history_message(20)
-        elif cmd == "jiu健康":
-            return self._show_health()
-        elif cmd == "jiu开启":
-            self.config.set("enabled", True)
-            return "✅ 插件已开启"
-        elif cmd == "jiu关闭":
-            self.config.set("enabled", False)
-            return "⏸️ 插件已关闭"
-        elif cmd == "jiu测试":
-            new_mode = not self.config.is_test_mode()
-            self.config.set("test_mode", new_mode)
-            return f"✅ 测试模式已{'开启' if new_mode else '关闭'}"
-        
-        # 添加码命令
-        if cmd.startswith("jiu注册") and len(lines) > 1:
-            codes = [line.strip() for line in lines[1:] if line.strip()]
-            return self._add_codes("\n".join(codes), "registration")
-        elif cmd.startswith("jiu金卡") and len(lines) > 1:
-            codes = [line.strip() for line in lines[1:] if line.strip()]
-            return self._add_lottery_codes("\n".join(codes), "gold")
-        elif cmd.startswith("jiu紫卡") and len(lines) > 1:
-            codes = [line.strip() for line in lines[1:] if line.strip()]
-            return self._add_lottery_codes("\n".join(codes), "purple")
-        elif cmd.startswith("jiu蓝卡") and len(lines) > 1:
-            codes = [line.strip() for line in lines[1:] if line.strip()]
-            return self._add_lottery_codes("\n".join(codes), "blue")
-        elif cmd.startswith("jiu活动卡") and len(lines) > 1:
-            codes = [line.strip() for line in lines[1:] if line.strip()]
-            return self._add_lottery_codes("\n".join(codes), "event")
-        
-        # 用户管理快捷命令
-        elif cmd.startswith("jiu用户"):
-            target_qq = cmd.replace("jiu用户", "").strip()
-            if target_qq:
-                return self._handle_user_action(qq, f"4-2 {target_qq}", lines)
-            return "❌ 格式: jiu用户 QQ号"
-        elif cmd.startswith("jiu重置"):
-            target_qq = cmd.replace("jiu重置", "").strip()
-            if target_qq:
-                return self._handle_user_action(qq, f"4-3 {target_qq}", lines)
-            return "❌ 格式: jiu重置 QQ号"
-        elif cmd.startswith("jiu黑名单"):
-            target_qq = cmd.replace("jiu黑名单", "").strip()
-            if target_qq:
-                return self._handle_blacklist_action(f"6-1 {target_qq}", lines)
-            return "❌ 格式: jiu黑名单 QQ号"
-        elif cmd.startswith("jiu解黑"):
-            target_qq = cmd.replace("jiu解黑", "").strip()
-            if target_qq:
-                return self._handle_blacklist_action(f"6-2 {target_qq}", lines)
-            return "❌ 格式: jiu解黑 QQ号"
-        elif cmd == "jiu导出":
-            return self._export_users()
-        elif cmd.startswith("jiu时间"):
-            # jiu时间 周X X / jiu时间 每周X X点
-            args = cmd.replace("jiu时间", "").strip()
-            if args:
-                parts = args.split()
-                if len(parts) >= 2:
-                    # 兼容 "每周X" 和 "周X" 两种格式
-                    weekday_part = parts[0].replace("每", "")
-                    hour_part = parts[1].replace("点", "")
-                    return self._handle_time_action(f"7-3 {weekday_part} {hour_part}", lines)
-            return "❌ 格式: jiu时间 周X 小时\n示例: jiu时间 周日 9"
-        elif cmd == "jiu公告":
-            self.session.set(qq, "announcement_menu", is_admin=True)
-            return self._show_announcement_menu(qq)
+        action = self._quick_actions.get(cmd)
+        if action:
+            return action(qq)
+        
+        # 添加码命令（首行为命令，其余每行一个码）
+        if len(lines) > 1:
+            for prefix, tier in _QUICK_ADD_CMDS:
+                if cmd.startswith(prefix):
+                    if tier == "registration":
+                        return self._add_codes(islice(lines, 1, None), tier)
+                    return self._add_lottery_codes(islice(lines, 1, None), tier)
+        
+        # 带参数的快捷命令：参数为去掉前缀后的部分
+        for prefix, action in self._quick_prefix_actions:
+            if cmd.startswith(prefix):
+                return action(cmd[len(prefix):].strip(), qq, lines)
         
         return None
     
+    def _quick_forward(self, code: str, usage: str):
+        """用户/黑名单快捷命令：带 QQ 参数转发为对应子菜单命令（复用 _prefix_actions），缺参时返回格式提示"""
+        action = self._prefix_actions[code.partition("-")[0]]
+        
+        def handler(target_qq: str, qq: str, lines: List[str]):
+            if target_qq:
+                return action(qq, f"{code} {target_qq}", lines)
+            return usage
+        return handler
+    
+    def _quick_set_time(self, args: str, qq: str, lines: List[str]) -> str:
+        """jiu时间 周X X / jiu时间 每周X X点"""
+        parts = args.split()
+        if len(parts) >= 2:
+            # 兼容 "每周X" 和 "周X" 两种格式
+            weekday_part = parts[0].replace("每", "")
+            hour_part = parts[1].replace("点", "")
+            return self._handle_time_action(f"7-3 {weekday_part} {hour_part}", lines)
+        return "❌ 格式: jiu时间 周X 小时\n示例: jiu时间 周日 9"
+    
+    def _set_enabled(self, enabled: bool) -> str:
+        """开启/关闭插件（jiu开启 / jiu关闭）"""
+        self.config.set("enabled", enabled)
+        return "✅ 插件已开启" if enabled else "⏸️ 插件已关闭"
+    
+    def _toggle_test_mode(self) -> str:
+        """切换测试模式（jiu测试）"""
+        new_mode = not self.config.is_test_mode()
+        self.config.set("test_mode", new_mode)
+        return f"✅ 测试模式已{'开启' if new_mode else '关闭'}"
+    
+    def _enter_announcement_menu(self, qq: str) -> str:
+        """进入公告管理菜单（jiu公告）"""
+        self.session.set(qq, "announcement_menu", is_admin=True)
+        return self._show_announcement_menu(qq)
+    
     # ==================== 活动卡池管理 ====================
     
     def _show_event_pool_menu(self) -> str:
@@ -932,21 +952,19 @@ class AdminHandler:
     def _handle_event_pool_action(self, action: str, lines: List[str]) -> str:
         """处理活动卡池操作"""
         # 只对命令部分upper，保留参数原始大小写
-        parts = action.split(" ", 2)
-        cmd = parts[0].upper()
+        head, _, rest = action.partition(" ")
+        cmd = head.upper()
         
         if cmd == "E-1":
             # 开启活动：E-1 活动名 结束时间（最后一段为日期，前面为活动名）
-            rest = action[len(parts[0]):].strip()
-            rest_parts = rest.rsplit(" ", 1)
-            if len(rest_parts) < 2 or not rest_parts[0].strip():
+            name, sep, end_time = rest.strip().rpartition(" ")
+            name = name.strip()
+            if not sep or not name:
                 return """❌ 格式错误
 
 正确格式: E-1 活动名 结束时间
 示例: E-1 春节活动 2026-02-15"""
             
-            name = rest_parts[0].strip()
-            end_time = rest_parts[1].strip()
             
             # 验证日期格式
             try:
@@ -992,58 +1010,68 @@ class AdminHandler:
     
     # ==================== 用户导入/导出 ====================
     
-    def _import_users(self, message: str) -> str:
-        """处理批量导入用户"""
-        qq_list = [line.strip() for line in message.split('\n') if line.strip()]
-        if not qq_list:
-            return "❌ 未检测到有效的 QQ 号"
-        
-        # 过滤非数字
-        valid_list = [qq for qq in qq_list if qq.isdigit()]
-        invalid_count = len(qq_list) - len(valid_list)
-        if not valid_list:
+    def _import_users(self, lines: List[str]) -> str:
+        """处理批量导入用户（lines 为逐行的 QQ 号）"""
+        # 一次遍历完成 去空行 + 非数字计数 + 保序去重
+        valid = {}
+        valid_count = 0
+        invalid_count = 0
+        for line in lines:
+            qq = line.strip()
+            if not qq:
+                continue
+            if qq.isdigit():
+                valid[qq] = None
+                valid_count += 1
+            else:
+                invalid_count += 1
+        
+        if not valid:
+            if not invalid_count:
+                return "❌ 未检测到有效的 QQ 号"
             return "❌ 未检测到有效的 QQ 号（QQ号应为纯数字）"
         
-        result = self.data.import_registered_users(valid_list)
-        self.data.log_action("批量导入用户", "ADMIN", f"新增{result['added']}人，跳过{result['skipped']}人")
+        result = self.data.import_registered_users(list(valid))
+        added = result["added"]
+        # 批内重复与已注册一样计入跳过
+        skipped = result["skipped"] + valid_count - len(valid)
+        self.data.log_action("批量导入用户", "ADMIN", f"新增{added}人，跳过{skipped}人")
         
         msg = f"""✅ 导入完成！
 
 📊 结果:
-├ 新增: {result['added']} 人
-└ 跳过（已注册）: {result['skipped']} 人"""
+├ 新增: {added} 人
+└ 跳过（已注册）: {skipped} 人"""
         if invalid_count > 0:
             msg += f"\n⚠️ 跳过 {invalid_count} 个非数字项"
         return msg
     
-    def _export_users(self) -> Union[str, List[str]]:
-        """导出全部用户数据（分批发送，每批50个，适配QQ消息长度限制）"""
+    async def _export_users(self) -> AsyncIterator[str]:
+        """导出全部用户数据（分批发送，每批50个，适配QQ消息长度限制）
+        
+        异步生成器逐批产出，调用方发送一批再取下一批，不同时保留全部批次文本
+        """
         users = self.data.get_all_registered_users()
         total = len(users)
         
         if total == 0:
-            return "📋 暂无注册用户可导出"
+            yield "📋 暂无注册用户可导出"
+            return
         
         BATCH_SIZE = 50
-        batches = []
         total_batches = (total + BATCH_SIZE - 1) // BATCH_SIZE
         
-        for i in range(0, total, BATCH_SIZE):
-            batch = users[i:i + BATCH_SIZE]
-            batch_num = i // BATCH_SIZE + 1
-            
-            header = f"📤 【用户导出】({batch_num}/{total_batches}) 共 {total} 人\n"
-            header += f"第 {i + 1}-{min(i + BATCH_SIZE, total)} 个\n"
-            header += "━━━━━━━━━━━━━━━━━\n"
-            
-            lines = []
-            for user_qq, info in batch:
-                lines.append(user_qq)
-            
-            batches.append(header + "\n".join(lines))
-        
-        # 在最后一批追加提示
-        batches[-1] += f"\n━━━━━━━━━━━━━━━━━\n✅ 导出完毕，共 {total} 人\n💡 可复制 QQ 号列表用于 4-5 批量导入"
-        
-        self.data.log_action("导出用户数据", "ADMIN", f"共{total}人，分{total_batches}批")
-        return batches
+        # 单个迭代器逐批取，不为每批切片复制列表
+        it = iter(users)
+        for batch_num in range(1, total_batches + 1):
+            start = (batch_num - 1) * BATCH_SIZE
+            end = min(start + BATCH_SIZE, total)
+            header = (f"📤 【用户导出】({batch_num}/{total_batches}) 共 {total} 人\n"
+                      f"第 {start + 1}-{end} 个\n"
+                      f"{_SEPARATOR}")
+            batch = "\n".join([header, *(user_qq for user_qq, _ in islice(it, BATCH_SIZE))])
+            if batch_num == total_batches:
+                # 在最后一批追加提示
+                batch += f"\n{_SEPARATOR}\n✅ 导出完毕，共 {total} 人\n💡 可复制 QQ 号列表用于 4-5 批量导入"
+                self.data.log_action("导出用户数据", "ADMIN", f"共{total}人，分{total_batches}批")
+            yield batch
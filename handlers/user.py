@@ -8,6 +8,7 @@ from astrbot.api.event import AstrMessageEvent
 from ..config import ConfigManager
 from ..data import DataManager
 from ..utils.session import SessionManager
+from ..utils.group_manager import extract_group_id
 from ..utils.templates import Templates
 from ..lottery.engine import TIER_INFO
 
@@ -37,7 +38,7 @@ class UserHandler:
         if not session:
             return None
         
-        state = session.get("state")
+        state = session.state
         
         # 取消操作
         if message.upper() == "Q":
@@ -93,9 +94,9 @@ class UserHandler:
         
         if not success:
             if status == "already_registered":
-                info = self.data.get_user_info(qq)
-                reg_code = info.get("reg_code", "未知") if info else "未知"
-                reg_time = info.get("reg_time", "未知")[:10] if info and info.get("reg_time") else "未知"
+                view = self.data.get_user_view(qq)
+                reg_code = view.reg_code if view else "未知"
+                reg_time = view.reg_time[:10] if view else "未知"
                 return f"""🎉 你已经是海梦家族成员啦！
 
 📋 你的注册码: {reg_code}
@@ -157,7 +158,8 @@ class UserHandler:
             return f"❌ {msg}" + Templates.USER_MINI_MENU
         
         # 记录日志（不含明文码）
-        tier_name = TIER_INFO.get(tier, {}).get("name", tier)
+        tier_info = TIER_INFO.get(tier)
+        tier_name = tier_info.name if tier_info else tier
         self.data.log_action("抽奖", qq, f"抽中{tier_name}")
         
         self.session.set(qq, "menu")
@@ -165,40 +167,21 @@ class UserHandler:
     
     def _get_my_info(self, qq: str) -> str:
         """获取个人信息"""
-        if not self.data.is_registered(qq):
-            return """👤 【我的信息】
-
-📋 注册状态: 未注册 ❌
-
-回复 1 立即加入海梦家族~"""
-        
-        info = self.data.get_user_info(qq)
-        reg_code = info.get("reg_code", "未知") if info else "未知"
-        reg_time = info.get("reg_time", "未知")
-        imported = "是" if info and info.get("imported") else "否"
-        
-        # 抽奖数据
-        lottery_data = self.data.get_user_lottery_data(qq)
-        total_draws = lottery_data.get("total_draws", 0)
-        week_draws = lottery_data.get("week_draws", 0)
-        pity_count = lottery_data.get("pity_count", 0)
-        config = self.data.get_lottery_config()
-        weekly_limit = config.get("weekly_limit", 1)
-        pity_threshold = config.get("pity_threshold", 10)
-        
-        msg = f"""👤 【我的信息】
-
-📋 注册状态: 已注册 ✅
-📝 注册码: {reg_code}
-📅 注册时间: {reg_time[:10] if len(str(reg_time)) > 10 else reg_time}
-📦 导入用户: {imported}
-
-🎰 抽奖数据:
-├ 累计抽奖: {total_draws} 次
-├ 本周已抽: {week_draws}/{weekly_limit} 次
-└ 保底进度: {pity_count}/{pity_threshold}"""
+        view = self.data.get_user_view(qq)
+        if view is None:
+            return Templates.USER_MY_INFO_UNREGISTERED
         
-        return msg
+        config = self.data.get_lottery_config()
+        return Templates.USER_MY_INFO.format(
+            reg_code=view.reg_code,
+            reg_time=view.reg_time[:10],
+            imported="是" if view.imported else "否",
+            total_draws=view.total_draws,
+            week_draws=view.week_draws,
+            weekly_limit=config.get("weekly_limit", 1),
+            pity_count=view.pity_count,
+            pity_threshold=config.get("pity_threshold", 10),
+        )
     
     def _get_announcement(self) -> str:
         """获取公告"""
@@ -207,18 +190,9 @@ class UserHandler:
         time_str = announcement.get("time", "")
         
         if not content:
-            return """📢 【最新公告】
-
-暂无公告~
-
-关注久获取最新消息！"""
+            return Templates.USER_ANNOUNCEMENT_EMPTY
         
-        return f"""📢 【最新公告】
-
-{content}
-
-━━━━━━━━━━━━━━━━━
-发布时间: {time_str[:16] if len(time_str) > 16 else time_str}"""
+        return Templates.USER_ANNOUNCEMENT.format(content=content, time=time_str[:16])
     
     def _get_time_info(self) -> str:
         """获取发放时间信息"""
@@ -227,16 +201,11 @@ class UserHandler:
         if time_str == "暂未设置" or time_str == "配置异常，请重新设置":
             return "📅 【发放时间】\n\n⏰ 发放时间: 暂未设置\n\n请联系久设置发放时间~"
         
-        # 通过 ConfigManager API 读取
-        exchange_time = self.config.get("exchange_time", {})
-        
-        try:
-            weekday = int(exchange_time.get("weekday", 0))
-            hour = int(exchange_time.get("hour", 0))
-            if not (0 <= weekday <= 6) or not (0 <= hour <= 23):
-                return "📅 【发放时间】\n\n⚠️ 时间配置异常，请联系久重新设置"
-        except (ValueError, TypeError):
+        # 加载/设置时已解析校验，非法配置为 None
+        exchange_time = self.config.get_exchange_time_tuple()
+        if exchange_time is None:
             return "📅 【发放时间】\n\n⚠️ 时间配置异常，请联系久重新设置"
+        weekday, hour = exchange_time
         
         now = datetime.now()
         days_until = (weekday - now.weekday()) % 7
@@ -252,16 +221,7 @@ class UserHandler:
         weekly_limit = self.data.get_lottery_config().get("weekly_limit", 1)
         limit_text = f"每周限 {weekly_limit} 次" if weekly_limit > 0 else "每周不限次数"
         
-        return f"""📅 【发放时间】
-
-⏰ 发放时段: {time_str}
-🔄 重置时间: 每周一 00:00
-
-{countdown}
-
-💡 温馨提示:
-• 注册码随时可领（仅限一次）
-• 抽奖{limit_text}"""
+        return Templates.USER_TIME_INFO.format(time_str=time_str, countdown=countdown, limit_text=limit_text)
     
     def _check_group(self, event: AstrMessageEvent, qq: str = None) -> bool:
         """
@@ -275,27 +235,15 @@ class UserHandler:
             return passed
         
         # 备用：老方法
-        if self.config.get("skip_group_check", False):
+        settings = self.config.settings
+        if settings.skip_group_check:
             return True
         
-        target_groups = self.config.get_target_groups()
-        if not target_groups:
+        if not settings.target_groups_set:
             return True
         
-        # 尝试获取群ID
-        group_id = None
-        
-        if hasattr(event, 'unified_msg_origin'):
-            origin = event.unified_msg_origin
-            if hasattr(origin, 'group_id'):
-                group_id = str(origin.group_id)
-        
-        if not group_id and hasattr(event, 'message_obj'):
-            msg_obj = event.message_obj
-            if hasattr(msg_obj, 'group_id'):
-                group_id = str(msg_obj.group_id)
-        
+        group_id = extract_group_id(event)
         if group_id:
-            return group_id in target_groups
+            return group_id in settings.target_groups_set
         
         return False
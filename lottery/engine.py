@@ -5,23 +5,47 @@
 资格检查和抽奖在同一个事务中完成，防止并发超发。
 """
 
-from typing import Optional, Tuple
+from typing import NamedTuple, Optional, Tuple
+
+from ..utils.templates import Templates
+
+
+class TierInfo(NamedTuple):
+    """卡片档次展示信息（属性访问，不可变）"""
+    name: str
+    icon: str
+    color: str
 
 
 # 卡片档次信息
 TIER_INFO = {
-    "gold": {"name": "金卡", "icon": "🥇", "color": "金色"},
-    "purple": {"name": "紫卡", "icon": "💜", "color": "紫色"},
-    "blue": {"name": "蓝卡", "icon": "💙", "color": "蓝色"},
-    "event": {"name": "活动卡", "icon": "🎪", "color": "彩色"}
+    "gold": TierInfo("金卡", "🥇", "金色"),
+    "purple": TierInfo("紫卡", "💜", "紫色"),
+    "blue": TierInfo("蓝卡", "💙", "蓝色"),
+    "event": TierInfo("活动卡", "🎪", "彩色"),
+}
+# 未知档次的兜底展示
+UNKNOWN_TIER = TierInfo("未知", "🎁", "")
+
+# 档次 -> 抽奖结果模板
+DRAW_RESULT_TEMPLATES = {
+    "gold": Templates.DRAW_RESULT_GOLD,
+    "purple": Templates.DRAW_RESULT_PURPLE,
+    "blue": Templates.DRAW_RESULT_BLUE,
+    "event": Templates.DRAW_RESULT_EVENT,
 }
 
+# 档次 -> 默认权重（与 DataManager 默认抽奖配置一致）
+TIER_DEFAULT_WEIGHTS = {"gold": 5, "purple": 20, "blue": 75, "event": 10}
+
 
 class LotteryEngine:
     """抽奖引擎"""
     
     def __init__(self, data_manager):
         self.data = data_manager
+        # 奖池信息缓存：(数据版本, 文本)；库存/配置/活动任一变化都会推进版本，自动失效
+        self._pool_info_cache = (None, "")
     
     def draw(self, qq: str, test_mode: bool = False) -> Tuple[Optional[str], Optional[str], str]:
         """
@@ -40,25 +64,36 @@ class LotteryEngine:
             return None, None, status
     
     def get_pool_info(self) -> str:
-        """获取奖池信息（展示真实可抽概率，含活动卡）"""
+        """获取奖池信息（展示真实可抽概率，含活动卡；按数据版本缓存）"""
+        # 先判活动状态：活动到期会在这里关闭并推进数据版本，保证下面取到的版本已包含该变化
+        event_active = self.data.is_event_pool_active()
+        version = self.data.version
+        cached_version, cached_msg = self._pool_info_cache
+        if cached_version == version:
+            return cached_msg
+        
+        # 版本在渲染前读取：渲染期间若有写入，下次调用版本不符会重新渲染
+        msg = self._render_pool_info(event_active)
+        self._pool_info_cache = (version, msg)
+        return msg
+    
+    def _render_pool_info(self, event_active: bool) -> str:
+        """渲染奖池信息文本（由 get_pool_info 按版本缓存）"""
         pools = self.data.get_all_pool_counts()
         config = self.data.get_lottery_config()
         
-        # 计算有库存的档次的真实概率（含活动卡，权重夹逼与引擎一致）
-        gold_w = max(1, int(config.get("gold_weight", 5) or 1)) if pools["gold"] > 0 else 0
-        purple_w = max(1, int(config.get("purple_weight", 20) or 1)) if pools["purple"] > 0 else 0
-        blue_w = max(1, int(config.get("blue_weight", 75) or 1)) if pools["blue"] > 0 else 0
-        event_w = max(1, int(config.get("event_weight", 10) or 1)) if (self.data.is_event_pool_active() and pools.get("event", 0) > 0) else 0
-        
-        total_w = gold_w + purple_w + blue_w + event_w
-        if total_w == 0:
-            total_w = 1  # 避免除零
+        # 计算有库存的档次的真实概率（含活动卡，权重夹逼与引擎一致；无货/活动未开的档次权重为 0）
+        weights = {
+            tier: max(1, int(config.get(f"{tier}_weight", default) or 1))
+            if pools.get(tier, 0) > 0 and (tier != "event" or event_active) else 0
+            for tier, default in TIER_DEFAULT_WEIGHTS.items()
+        }
+        total_w = sum(weights.values()) or 1  # 避免除零
         
         # 实际概率
-        gold_p = round(gold_w * 100 / total_w) if gold_w else 0
-        purple_p = round(purple_w * 100 / total_w) if purple_w else 0
-        blue_p = round(blue_w * 100 / total_w) if blue_w else 0
-        event_p = round(event_w * 100 / total_w) if event_w else 0
+        probs = {tier: round(w * 100 / total_w) for tier, w in weights.items()}
+        gold_p, purple_p, blue_p, event_p = probs["gold"], probs["purple"], probs["blue"], probs["event"]
+        event_w = weights["event"]
         
         msg = f"""🎰 【奖池信息】
 
@@ -85,70 +120,24 @@ class LotteryEngine:
         return msg
     
     def get_draw_result_message(self, tier: str, code: str, qq: str) -> str:
-        """获取抽奖结果消息"""
-        tier_info = TIER_INFO.get(tier, {})
-        icon = tier_info.get("icon", "🎁")
-        name = tier_info.get("name", "未知")
-        
+        """获取抽奖结果消息（按档次查模板，一次 format）"""
+        tier_info = TIER_INFO.get(tier, UNKNOWN_TIER)
         user_data = self.data.get_user_lottery_data(qq)
-        total_draws = user_data.get("total_draws", 0)
-        
-        if tier == "gold":
-            return f"""🎰 正在抽奖...
-
-🎊🎊🎊 超级幸运！🎊🎊🎊
-
-✨✨ 恭喜你抽中了 {icon}【{name}】！✨✨
-
-你的兑换码：
-🎁 {code}
-
-太厉害了！你是欧皇！
-累计抽奖: {total_draws} 次"""
-        
-        elif tier == "purple":
-            return f"""🎰 正在抽奖...
-
-🎉 运气不错！
-
-✨ 恭喜你抽中了 {icon}【{name}】！
-
-你的兑换码：
-🎁 {code}
-
-紫卡哦，比很多人都幸运~
-累计抽奖: {total_draws} 次"""
-        
-        elif tier == "blue":
-            config = self.data.get_lottery_config()
-            pity_count = user_data.get("pity_count", 0)
-            pity_threshold = config.get("pity_threshold", 10)
-            
-            return f"""🎰 正在抽奖...
-
-恭喜你抽中了 {icon}【{name}】！
-
-你的兑换码：
-🎁 {code}
-
-下次说不定能抽到紫卡或金卡~
-保底进度: {pity_count}/{pity_threshold}"""
         
+        fields = {
+            "icon": tier_info.icon,
+            "name": tier_info.name,
+            "code": code,
+            "total_draws": user_data.get("total_draws", 0),
+        }
+        # 仅蓝卡/活动卡需要的数据按需读取
+        if tier == "blue":
+            fields["pity_count"] = user_data.get("pity_count", 0)
+            fields["pity_threshold"] = self.data.get_lottery_config().get("pity_threshold", 10)
         elif tier == "event":
-            event_info = self.data.get_event_pool_info()
-            event_name = event_info.get("name", "活动")
-            return f"""🎰 正在抽奖...
-
-🎪 哇！抽中了限定活动卡！
-
-✨ 恭喜你抽中了 {icon}【{event_name}】！
-
-你的兑换码：
-🎁 {code}
-
-这是限定活动卡，非常珍贵！"""
+            fields["name"] = self.data.get_event_pool_info().get("name", "活动")
         
-        return f"恭喜你抽中了 {icon}【{name}】！\n兑换码: {code}"
+        return DRAW_RESULT_TEMPLATES.get(tier, Templates.DRAW_RESULT_DEFAULT).format_map(fields)
     
     def get_history_message(self, limit: int = 10) -> str:
         """获取抽奖历史消息"""
@@ -157,21 +146,14 @@ class LotteryEngine:
         if not history:
             return "📜 暂无抽奖记录"
         
-        msg = f"📜 【最近 {len(history)} 条抽奖记录】\n\n"
-        
+        rows = []
         for i, record in enumerate(history, 1):
-            tier_info = TIER_INFO.get(record["tier"], {})
-            icon = tier_info.get("icon", "🎁")
-            name = tier_info.get("name", "未知")
-            time_str = record["time"][11:16] if len(record["time"]) > 16 else record["time"]
+            tier_info = TIER_INFO.get(record["tier"], UNKNOWN_TIER)
+            ts = record["time"]
+            time_str = ts[11:16] if len(ts) > 16 else ts
             qq = record["qq"]
-            
             # 隐藏部分QQ
-            if len(qq) > 4:
-                qq_display = qq[:3] + "***" + qq[-2:]
-            else:
-                qq_display = qq
-            
-            msg += f"{i}. {qq_display} → {icon} {name} ({time_str})\n"
+            qq_display = f"{qq[:3]}***{qq[-2:]}" if len(qq) > 4 else qq
+            rows.append(f"{i}. {qq_display} → {tier_info.icon} {tier_info.name} ({time_str})\n")
         
-        return msg
+        return f"📜 【最近 {len(history)} 条抽奖记录】\n\n" + "".join(rows)
@@ -14,6 +14,9 @@ AstrBot 插件 - 智能管理注册码和抽奖兑换码
 """
 
 import asyncio
+import time
+import weakref
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
@@ -24,12 +27,32 @@ from astrbot.api import logger
 from .config import ConfigManager
 from .data import DataManager
 from .utils.session import SessionManager
-from .utils.group_manager import GroupMemberManager, GroupVerifier
+from .utils.group_manager import GroupMemberManager, GroupVerifier, extract_group_id
 from .lottery.engine import LotteryEngine
 from .handlers.user import UserHandler
 from .handlers.admin import AdminHandler
 from .utils.templates import Templates
 
+# 周重置等待时单次 sleep 上限（秒）：分段等待并按墙钟复核，主机休眠/时钟调整后不会提前或错过重置
+RESET_MAX_SLEEP = 3600
+
+# 群成员活跃记录节流：同一 (群号, QQ) 在此间隔（秒）内重复发言不再写入成员缓存（TTL 以天计，不影响过期判断）
+MEMBER_RECORD_INTERVAL = 600
+# 节流表容量上限，超过时整体清空重新计
+MEMBER_SEEN_MAX = 50000
+
+
+def _next_monday_midnight(now: datetime) -> datetime:
+    """计算 now 之后的下一个周一 00:00（now 恰为周一时取下周一）"""
+    days_until_monday = (7 - now.weekday()) % 7 or 7
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + timedelta(days=days_until_monday)
+
+
+def _log_plugin_collected(plugin_dir: str):
+    """插件实例被回收时的记录（只写日志：回收/解释器退出时不再触碰事件循环和数据文件）"""
+    logger.debug(f"[海梦酱] 插件实例已回收: {plugin_dir}")
+
 
 @register("astrbot_plugin_haimeng_code", "久", "海梦酱码管理系统 - 智能抽奖发码", "2.2.1")
 class HaimengCodePlugin(Star):
@@ -51,6 +74,8 @@ class HaimengCodePlugin(Star):
         # 群成员管理器（通过监听群消息收集成员）
         self.group_mgr = GroupMemberManager(context, self.config_mgr, self.plugin_dir)
         self.group_verifier = GroupVerifier(self.config_mgr, self.group_mgr)
+        # (群号, QQ) -> 上次记录活跃的 monotonic 时间
+        self._member_seen = {}
         
         # 初始化抽奖引擎
         self.lottery = LotteryEngine(self.data_mgr)
@@ -74,6 +99,9 @@ class HaimengCodePlugin(Star):
         
         # 清理标记
         self._terminated = False
+        # 落盘只在 terminate() 中进行（数据另有 atexit 兜底，配置有 journal 重放）；
+        # 回收时仅记录日志，不用 __del__，避免对象复活与关闭阶段模块半销毁时执行清理
+        weakref.finalize(self, _log_plugin_collected, str(self.plugin_dir))
         
         logger.info("[海梦酱] 插件加载成功！v2.2.1")
     
@@ -92,7 +120,9 @@ class HaimengCodePlugin(Star):
             if hasattr(self, 'group_mgr'):
                 self.group_mgr.stop()
             if hasattr(self, 'data_mgr'):
-                self.data_mgr.save()
+                self.data_mgr.close()
+            if hasattr(self, 'config_mgr'):
+                self.config_mgr.flush()
             logger.info("[海梦酱] 插件卸载，数据已保存")
         except Exception as e:
             logger.debug(f"[海梦酱] 卸载时保存异常: {e}")
@@ -101,10 +131,6 @@ class HaimengCodePlugin(Star):
         """AstrBot 卸载/禁用时调用（正式生命周期钩子）"""
         self._do_cleanup()
     
-    def __del__(self):
-        """备用清理（不保证被调用，但聊胜于无）"""
-        self._do_cleanup()
-    
     def _try_start_scheduled_tasks(self):
         """尝试启动定时任务"""
         try:
@@ -145,24 +171,18 @@ class HaimengCodePlugin(Star):
     
     async def _schedule_weekly_reset(self):
         """每周重置定时任务（异常自愈）"""
-        from datetime import datetime, timedelta
-        
         while True:
             try:
                 now = datetime.now()
-                
-                # 计算下一个周一00:00
-                days_until_monday = (7 - now.weekday()) % 7
-                if days_until_monday == 0 and now.hour >= 0:
-                    days_until_monday = 7
-                
-                next_monday = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                next_monday += timedelta(days=days_until_monday)
+                next_monday = _next_monday_midnight(now)
                 
                 wait_seconds = (next_monday - now).total_seconds()
                 logger.info(f"[海梦酱] 下次重置: {next_monday.strftime('%Y-%m-%d %H:%M')}, 等待 {wait_seconds:.0f}秒")
                 
-                await asyncio.sleep(wait_seconds)
+                # 分段等待，每段醒来按墙钟复核剩余时间，到点前不会执行重置
+                while wait_seconds > 0:
+                    await asyncio.sleep(min(wait_seconds, RESET_MAX_SLEEP))
+                    wait_seconds = (next_monday - datetime.now()).total_seconds()
                 
                 # 执行重置
                 self.data_mgr.weekly_reset()
@@ -188,13 +208,17 @@ class HaimengCodePlugin(Star):
         if self.config_mgr.is_admin(qq):
             response = await self.admin_handler.handle(qq, message)
             if response:
-                # 支持批量消息（如用户导出分批发送）
-                if isinstance(response, list):
+                # 支持批量消息（如用户导出：异步生成器逐批产出，发一批取一批）
+                if isinstance(response, str):
+                    yield event.plain_result(response)
+                elif isinstance(response, list):
                     for msg in response:
                         yield event.plain_result(msg)
                         await asyncio.sleep(0.5)  # 避免QQ消息限流
                 else:
-                    yield event.plain_result(response)
+                    async for msg in response:
+                        yield event.plain_result(msg)
+                        await asyncio.sleep(0.5)  # 避免QQ消息限流
             else:
                 # 管理员发了不认识的消息，也要消费掉，防止AI抢回复
                 yield event.plain_result("💡 发送 jiu 打开控制面板")
@@ -208,14 +232,15 @@ class HaimengCodePlugin(Star):
         if self.data_mgr.is_blacklisted(qq):
             return
         
-        # 用户消息处理
-        response = await self.user_handler.handle(event, qq, message)
-        if response:
-            yield event.plain_result(Templates.USER_WARNING + response)
-            return
+        # 用户消息处理（既不是触发词也不在会话中的消息与插件无关，直接走兜底，不进入处理器）
+        trigger = self.config_mgr.get_trigger_keyword()
+        if message == trigger or self.session_mgr.has(qq):
+            response = await self.user_handler.handle(event, qq, message)
+            if response:
+                yield event.plain_result(Templates.USER_WARNING + response)
+                return
         
         # 兜底：消费所有未处理的私聊消息，防止AI回复无关内容
-        trigger = self.config_mgr.get_trigger_keyword()
         yield event.plain_result(f"💡 发送「{trigger}」开始使用")
     
     @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
@@ -229,21 +254,18 @@ class HaimengCodePlugin(Star):
             
             qq = str(event.get_sender_id())
             
-            # 尝试获取群ID
-            group_id = None
-            
-            if hasattr(event, 'unified_msg_origin'):
-                origin = event.unified_msg_origin
-                if hasattr(origin, 'group_id') and origin.group_id:
-                    group_id = str(origin.group_id)
-            
-            if not group_id and hasattr(event, 'message_obj'):
-                msg_obj = event.message_obj
-                if hasattr(msg_obj, 'group_id') and msg_obj.group_id:
-                    group_id = str(msg_obj.group_id)
+            group_id = extract_group_id(event)
             
-            # 记录群成员
+            # 记录群成员（活跃发言者节流，短时间内的重复发言直接跳过）
             if group_id and qq:
+                key = (group_id, qq)
+                now = time.monotonic()
+                last = self._member_seen.get(key)
+                if last is not None and now - last < MEMBER_RECORD_INTERVAL:
+                    return
+                if len(self._member_seen) >= MEMBER_SEEN_MAX:
+                    self._member_seen.clear()
+                self._member_seen[key] = now
                 self.group_mgr.record_member(group_id, qq)
                 
         except Exception as e:
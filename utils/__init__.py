@@ -3,6 +3,8 @@
 
 from .session import SessionManager
 from .templates import Templates
-from .group_manager import GroupMemberManager, GroupVerifier
+from .group_manager import GroupMemberManager, GroupVerifier, extract_group_id
+from .rwlock import ReadWriteLock
 
-__all__ = ['SessionManager', 'Templates', 'GroupMemberManager', 'GroupVerifier']
+__all__ = ['SessionManager', 'Templates', 'GroupMemberManager', 'GroupVerifier', 'ReadWriteLock',
+           'extract_group_id']
@@ -16,31 +16,113 @@ v2.1 新增：
 """
 
 import asyncio
-from typing import Set, Dict, Optional
-from datetime import datetime, timedelta
+import hashlib
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Set, Dict, FrozenSet, Optional
+from datetime import datetime
 from pathlib import Path
 import json
 from astrbot.api import logger
+from .jsonio import json_loads, json_dumps_bytes
+
+try:
+    from fastrlock.rlock import FastRLock as RLock  # 可选加速：C 实现的可重入锁
+except ImportError:
+    RLock = threading.RLock
 
 
 # 默认缓存TTL（天）- 超过这个时间未活跃的成员会被清理
 DEFAULT_CACHE_TTL_DAYS = 30
 
+# 统计中的时间项：内存中为整数秒时间戳，文件中为 ISO 字符串
+_STAT_TIME_KEYS = ("last_collect_time", "last_cleanup_time")
+
+
+def _to_epoch(value) -> Optional[int]:
+    """文件中的活跃时间转为整数秒时间戳（ISO 字符串或数字）；无法解析返回 None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            return None
+    return None
+
+
+def _format_ts(ts: int) -> str:
+    """整数时间戳格式化为展示用的 YYYY-MM-DD HH:MM"""
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))
+
+
+def _members_digest(members: dict) -> str:
+    """成员数据摘要：按文件中的顺序逐条哈希 (群号, QQ, 时间串)
+    
+    保存时随文件写入，启动加载时重算比对，发现 JSON 仍可解析但内容被篡改/损坏的情况
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for group_id, group in members.items():
+        if isinstance(group, dict):
+            for qq, value in group.items():
+                h.update(f"{group_id}\t{qq}\t{value}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def extract_group_id(event) -> Optional[str]:
+    """从消息事件取群号（unified_msg_origin 优先，其次 message_obj），取不到返回 None
+
+    用 getattr 默认值代替 hasattr 探测，每条消息最多四次属性访问
+    """
+    gid = getattr(getattr(event, 'unified_msg_origin', None), 'group_id', None)
+    if gid:
+        return str(gid)
+    gid = getattr(getattr(event, 'message_obj', None), 'group_id', None)
+    return str(gid) if gid else None
+
+
+# 临时会话来源群号可能所在的属性链（按优先级），模块级预先构建
+_TEMP_SOURCE_PATHS = (
+    ("message_obj", "temp_source"),
+    ("message_obj", "sender", "group_id"),
+)
+
+
+def _resolve_attr_path(obj, path: tuple):
+    """沿属性链逐级 getattr（带默认值，缺失时不抛异常），任一级为 None 返回 None"""
+    for name in path:
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+    return obj
+
 
 class GroupMemberManager:
     """群成员管理器 - 通过监听群消息收集成员（带TTL，线程安全）"""
     
+    FLUSH_INTERVAL = 30  # 后台写入检查间隔（秒）
+    GROUP_LOCK_STRIPES = 16  # 群条带锁数量（须为 2 的幂）
+    
     def __init__(self, context, config_manager, plugin_dir: Path = None):
-        import threading
-        
         self.context = context
         self.config = config_manager
         
         # 线程锁
-        self._lock = threading.RLock()
+        # _group_locks: 按群号分条带，同一群的成员增删串行化，不同群的记录互不阻塞
+        # _lock: 全局锁，保护群字典本身的增删、反向索引与统计
+        # 加锁顺序固定为 条带锁（按下标升序）→ 全局锁
+        self._group_locks = tuple(threading.Lock() for _ in range(self.GROUP_LOCK_STRIPES))
+        self._lock = RLock()
         
-        # 群成员缓存 {群号: {成员QQ: 最后活跃时间}}
-        self._member_cache: Dict[str, Dict[str, str]] = {}
+        # 群成员缓存 {群号: {成员QQ: 最后活跃时间（整数秒时间戳）}}
+        # 内存中只比较整数；ISO 字符串只在加载/保存文件时转换
+        self._member_cache: Dict[str, Dict[str, int]] = {}
+        
+        # 反向索引 {成员QQ: frozenset{群号}}，跨群查询只需一次哈希查找
+        # 值为不可变集合，写者整体替换，读者可无锁遍历
+        self._qq_to_groups: Dict[str, FrozenSet[str]] = {}
         
         # 持久化文件
         self._cache_file = plugin_dir / "group_members.json" if plugin_dir else None
@@ -58,6 +140,13 @@ class GroupMemberManager:
         # 加载已保存的缓存
         self._load_cache()
         
+        # 合并写入：修改只打脏标记，由后台线程每 FLUSH_INTERVAL 秒落盘
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._last_saved_digest: Optional[bytes] = None  # 上次成功写入内容的摘要，内容未变时跳过写盘
+        
         # 启动时清理过期成员
         self._cleanup_expired_members()
     
@@ -71,8 +160,8 @@ class GroupMemberManager:
         # 尝试加载主文件
         if self._cache_file.exists():
             try:
-                with open(self._cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(self._cache_file, 'rb') as f:
+                    data = json_loads(f.read())
                 self._parse_cache_data(data)
                 logger.info(f"[海梦酱] 加载群成员缓存: {self.get_member_count()} 人")
                 return
@@ -84,8 +173,8 @@ class GroupMemberManager:
         # 尝试从备份恢复
         if backup_file.exists():
             try:
-                with open(backup_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(backup_file, 'rb') as f:
+                    data = json_loads(f.read())
                 self._parse_cache_data(data)
                 
                 # 恢复成功，修复主文件
@@ -101,19 +190,44 @@ class GroupMemberManager:
                 logger.error(f"[海梦酱] 群成员缓存备份也损坏: {e}")
     
     def _parse_cache_data(self, data: dict):
-        """解析缓存数据"""
+        """解析缓存数据（摘要不一致时抛出 ValueError，由调用方回退到备份）"""
+        raw_members = data.get("members", {})
+        expected = data.get("members_digest")  # 旧版本文件没有摘要，跳过校验
+        if expected is not None and _members_digest(raw_members) != expected:
+            raise ValueError("群成员缓存校验失败（摘要不一致）")
+        
+        now_ts = int(time.time())
+        invalid = 0
+        # QQ/群号字符串驻留（sys.intern）：同一 QQ 在多个群字典与反向索引中共享同一对象
+        intern = sys.intern
         # 兼容旧格式（无TTL的Set）
-        for group_id, members in data.get("members", {}).items():
+        for group_id, members in raw_members.items():
+            group_id = intern(group_id)
             if isinstance(members, list):
                 # 旧格式：列表，转换为带时间戳的字典
-                self._member_cache[group_id] = {
-                    qq: datetime.now().isoformat() for qq in members
-                }
+                self._member_cache[group_id] = dict.fromkeys(map(intern, map(str, members)), now_ts)
             elif isinstance(members, dict):
-                # 新格式：字典 {qq: last_active_time}
-                self._member_cache[group_id] = members
+                # 新格式：字典 {qq: last_active_time}，加载时一次性转为时间戳
+                converted = {}
+                for qq, value in members.items():
+                    ts = _to_epoch(value)
+                    if ts is None:
+                        invalid += 1  # 无效时间格式 = 脏数据，丢弃（防止TTL绕过）
+                    else:
+                        converted[intern(qq)] = ts
+                if converted:
+                    self._member_cache[group_id] = converted
+        if invalid:
+            logger.warning(f"[海梦酱] 群成员缓存中 {invalid} 条时间戳格式错误，已丢弃")
+        
+        self._rebuild_qq_index()
         
-        self._stats = data.get("stats", self._stats)
+        stats = data.get("stats")
+        if isinstance(stats, dict):
+            stats = dict(stats)
+            for key in _STAT_TIME_KEYS:
+                stats[key] = _to_epoch(stats.get(key))
+            self._stats = stats
         raw_ttl = data.get("cache_ttl_days", DEFAULT_CACHE_TTL_DAYS)
         try:
             ttl = int(raw_ttl)
@@ -124,27 +238,76 @@ class GroupMemberManager:
             self._cache_ttl_days = DEFAULT_CACHE_TTL_DAYS
             logger.warning(f"[海梦酱] 群缓存 TTL 值异常: {raw_ttl!r}，回退默认 {DEFAULT_CACHE_TTL_DAYS} 天")
     
+    def _rebuild_qq_index(self):
+        """根据 _member_cache 重建 QQ -> 群号 反向索引"""
+        index: Dict[str, Set[str]] = {}
+        for group_id, members in self._member_cache.items():
+            for qq in members:
+                index.setdefault(qq, set()).add(group_id)
+        self._qq_to_groups = {qq: frozenset(groups) for qq, groups in index.items()}
+    
+    def _unindex_member(self, group_id: str, qq: str):
+        """从反向索引移除一条 (群, 成员) 记录，空集合一并删除"""
+        groups = self._qq_to_groups.get(qq)
+        if groups is not None and group_id in groups:
+            remaining = groups - {group_id}
+            if remaining:
+                self._qq_to_groups[qq] = remaining
+            else:
+                del self._qq_to_groups[qq]
+    
     def _save_cache(self):
-        """保存缓存（原子写入）"""
+        """保存缓存：锁内取浅拷贝快照并清除脏标记，锁外序列化、原子写入
+        
+        注意：不要在持有任何成员锁时调用（加锁顺序为 _save_lock -> 条带锁 -> _lock）
+        """
         if not self._cache_file:
             return
         
+        # _save_lock 保证快照与写入按顺序进行，旧快照不会覆盖新文件
+        with self._save_lock:
+            with self._locked_all():
+                members = {gid: dict(m) for gid, m in self._member_cache.items()}
+                stats = dict(self._stats)
+                self._dirty = False
+            if not self._write_cache(members, stats):
+                self._dirty = True  # 写入失败，下次定时检查重试
+    
+    def _write_cache(self, members: Dict[str, Dict[str, int]], stats: dict) -> bool:
+        """序列化快照并原子写入文件，返回是否成功（内容与上次写入相同时直接跳过）"""
         import tempfile
         import os
         
         try:
+            # 文件中保持 ISO 时间字符串（与旧版本格式兼容）
+            to_iso = datetime.fromtimestamp
+            members_iso = {
+                group_id: {qq: to_iso(ts).isoformat() for qq, ts in group.items()}
+                for group_id, group in members.items()
+            }
             data = {
-                "members": self._member_cache,
-                "stats": self._stats,
+                "members": members_iso,
+                "members_digest": _members_digest(members_iso),
+                "stats": {
+                    key: (to_iso(value).isoformat() if key in _STAT_TIME_KEYS and value is not None else value)
+                    for key, value in stats.items()
+                },
                 "cache_ttl_days": self._cache_ttl_days
             }
             
+            payload = json_dumps_bytes(data, indent=True)
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+            if digest == self._last_saved_digest:
+                return True
+            
             # 写入临时文件
             dir_path = self._cache_file.parent
             fd, temp_path = tempfile.mkstemp(dir=dir_path, prefix='group_members_', suffix='.tmp')
             try:
-                with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
                 
                 if os.name == 'nt':  # Windows 备份策略
                     backup_path = str(self._cache_file) + '.bak'
@@ -161,6 +324,13 @@ class GroupMemberManager:
                     # 注意：不删除备份文件，_load_cache() 依赖 .bak 做异常恢复
                 else:  # Unix
                     os.replace(temp_path, self._cache_file)
+                    # fsync 父目录，确保 rename 本身落盘
+                    if hasattr(os, 'O_DIRECTORY'):
+                        dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+                        try:
+                            os.fsync(dir_fd)
+                        finally:
+                            os.close(dir_fd)
                     
             except Exception as e:
                 logger.error(f"[海梦酱] 保存群成员缓存失败: {e}")
@@ -169,47 +339,77 @@ class GroupMemberManager:
                         os.remove(temp_path)
                 except OSError:
                     pass
+                return False
         except Exception as e:
             logger.error(f"[海梦酱] 保存群成员缓存失败: {e}")
+            return False
+        self._last_saved_digest = digest
+        return True
+    
+    def _group_lock(self, group_id: str):
+        """取群号对应的条带锁"""
+        return self._group_locks[hash(group_id) & (self.GROUP_LOCK_STRIPES - 1)]
+    
+    @contextmanager
+    def _locked_all(self):
+        """按固定顺序获取全部条带锁与全局锁（整体快照、清理时使用）"""
+        with ExitStack() as stack:
+            for lock in self._group_locks:
+                stack.enter_context(lock)
+            stack.enter_context(self._lock)
+            yield
     
     def _cleanup_expired_members(self):
-        """清理过期成员"""
-        now = datetime.now()
-        cutoff = now - timedelta(days=self._cache_ttl_days)
+        """清理过期成员（调用者已持有 _locked_all，或处于单线程的初始化阶段）"""
+        now_ts = int(time.time())
+        cutoff_ts = now_ts - self._cache_ttl_days * 86400
         cleaned = 0
+        empty_groups = []
         
-        for group_id in list(self._member_cache.keys()):
-            members = self._member_cache[group_id]
-            for qq in list(members.keys()):
-                try:
-                    last_active = datetime.fromisoformat(members[qq])
-                    if last_active < cutoff:
-                        del members[qq]
-                        cleaned += 1
-                except (ValueError, KeyError):
-                    # 无效时间格式 = 脏数据，清理掉
-                    del members[qq]
-                    cleaned += 1
+        # 只收集待删除项，不复制整份键列表；遍历结束后再删除
+        for group_id, members in self._member_cache.items():
+            expired = [qq for qq, ts in members.items() if ts < cutoff_ts]
+            for qq in expired:
+                del members[qq]
+                self._unindex_member(group_id, qq)
+            cleaned += len(expired)
             
-            # 如果群成员为空，删除该群
             if not members:
-                del self._member_cache[group_id]
+                empty_groups.append(group_id)
+        
+        # 如果群成员为空，删除该群
+        for group_id in empty_groups:
+            del self._member_cache[group_id]
         
         if cleaned > 0:
-            self._stats["last_cleanup_time"] = now.isoformat()
-            self._save_cache()
+            self._stats["last_cleanup_time"] = now_ts
+            self._dirty = True
             logger.info(f"[海梦酱] 清理过期群成员: {cleaned} 人")
     
     def start(self):
-        """启动（同步）"""
+        """启动（同步）：开启后台写入线程"""
+        if self._flush_thread is None or not self._flush_thread.is_alive():
+            self._stop_event.clear()
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name="haimeng-member-flush", daemon=True
+            )
+            self._flush_thread.start()
         logger.info(f"[海梦酱] 群成员管理器已启动（监听模式，TTL={self._cache_ttl_days}天），已缓存 {self.get_member_count()} 人")
     
     def stop(self):
-        """停止并flush缓存（同步，可安全在__del__中调用）"""
-        with self._lock:
-            self._save_cache()
+        """停止后台写入线程并flush缓存（同步）"""
+        self._stop_event.set()
+        if self._flush_thread is not None and self._flush_thread.is_alive():
+            self._flush_thread.join(timeout=2)
+        self._save_cache()
         logger.info("[海梦酱] 群成员缓存已保存")
     
+    def _flush_loop(self):
+        """后台写入线程：每 FLUSH_INTERVAL 秒检查一次脏标记，有修改时整体写入"""
+        while not self._stop_event.wait(self.FLUSH_INTERVAL):
+            if self._dirty:
+                self._save_cache()
+    
     def record_member(self, group_id: str, qq: str):
         """
         记录群成员（带时间戳，线程安全）
@@ -218,34 +418,36 @@ class GroupMemberManager:
             group_id: 群号
             qq: 用户QQ号
         """
-        target_groups = self.config.get_target_groups()
-        
-        # 只记录目标群的成员
-        if target_groups and group_id not in target_groups:
+        # 只记录目标群的成员（配置快照按版本重建，目标群已是 frozenset）
+        targets = self.config.settings.target_groups_set
+        if targets and group_id not in targets:
             return
         
-        with self._lock:
-            if group_id not in self._member_cache:
-                self._member_cache[group_id] = {}
+        with self._group_lock(group_id):
+            members = self._member_cache.get(group_id)
+            if members is None:
+                # 新群：群字典本身的增删在全局锁内完成，遍历群列表的方法不会看到中间状态
+                with self._lock:
+                    members = self._member_cache.setdefault(sys.intern(group_id), {})
             
-            now = datetime.now().isoformat()
-            is_new = qq not in self._member_cache[group_id]
+            now_ts = int(time.time())
+            is_new = qq not in members
+            if is_new:
+                # 新键驻留；已有键复用字典中的原对象，不必每次驻留
+                qq = sys.intern(qq)
+                group_id = sys.intern(group_id)
             
             # 更新活跃时间
-            self._member_cache[group_id][qq] = now
+            members[qq] = now_ts
             
             if is_new:
-                self._stats["total_collected"] += 1
-                self._stats["last_collect_time"] = now
-                
-                # 每收集50个新成员保存一次
-                if self._stats["total_collected"] % 50 == 0:
-                    self._save_cache()
-            else:
-                # 活跃更新也定期落盘，防止重启丢失活跃时间
-                self._active_update_count = getattr(self, '_active_update_count', 0) + 1
-                if self._active_update_count % 200 == 0:
-                    self._save_cache()
+                with self._lock:
+                    self._qq_to_groups[qq] = self._qq_to_groups.get(qq, frozenset()) | {group_id}
+                    self._stats["total_collected"] += 1
+                    self._stats["last_collect_time"] = now_ts
+            
+            # 只打脏标记（活跃时间更新同样需要落盘），由后台线程合并写入
+            self._dirty = True
     
     def record_member_join(self, group_id: str, qq: str):
         """记录新成员入群"""
@@ -254,19 +456,21 @@ class GroupMemberManager:
     
     def record_member_leave(self, group_id: str, qq: str):
         """记录成员退群（线程安全）"""
-        with self._lock:
-            if group_id in self._member_cache:
-                if qq in self._member_cache[group_id]:
-                    del self._member_cache[group_id][qq]
-                    self._save_cache()
-                    logger.info(f"[海梦酱] 成员退群: 群{group_id} QQ{qq}")
+        with self._group_lock(group_id):
+            members = self._member_cache.get(group_id)
+            if members is not None and qq in members:
+                del members[qq]
+                with self._lock:
+                    self._unindex_member(group_id, qq)
+                self._dirty = True
+                logger.info(f"[海梦酱] 成员退群: 群{group_id} QQ{qq}")
     
     def is_group_member(self, qq: str, group_id: Optional[str] = None) -> bool:
         """
-        检查用户是否是群成员（从缓存检查，带TTL，线程安全）
+        检查用户是否是群成员（从缓存检查，带TTL，无锁读）
         
         安全策略：
-        - 时间戳解析失败视为无效（防止TTL绕过）
+        - 时间戳解析失败的记录在加载时已丢弃（防止TTL绕过）
         - 检查时按 target_groups 过滤
         
         Args:
@@ -276,41 +480,27 @@ class GroupMemberManager:
         Returns:
             是否是群成员（且未过期）
         """
-        now = datetime.now()
-        cutoff = now - timedelta(days=self._cache_ttl_days)
-        target_groups = self.config.get_target_groups()
+        cutoff_ts = int(time.time()) - self._cache_ttl_days * 86400
+        # 同一次检查内只取一次配置快照，后续为 frozenset 哈希探测
+        targets = self.config.settings.target_groups_set
         
-        with self._lock:
-            if group_id:
-                # 检查指定群是否在目标群内
-                if target_groups and group_id not in target_groups:
-                    return False
-                
-                members = self._member_cache.get(group_id, {})
-                if qq in members:
-                    try:
-                        last_active = datetime.fromisoformat(members[qq])
-                        return last_active >= cutoff
-                    except ValueError:
-                        # 时间戳解析失败，视为无效（安全策略）
-                        logger.debug(f"[海梦酱] 成员 {qq} 时间戳格式错误，视为无效")
-                        return False
-                return False
-            else:
-                # 检查所有目标群
-                groups_to_check = target_groups if target_groups else self._member_cache.keys()
-                
-                for gid in groups_to_check:
-                    members = self._member_cache.get(gid, {})
-                    if qq in members:
-                        try:
-                            last_active = datetime.fromisoformat(members[qq])
-                            if last_active >= cutoff:
-                                return True
-                        except ValueError:
-                            # 时间戳解析失败，继续检查其他群
-                            continue
+        # 无锁读：写者只做单键赋值/删除或整体替换不可变集合，CPython 下单次 dict 操作是原子的
+        if group_id:
+            # 检查指定群是否在目标群内
+            if targets and group_id not in targets:
                 return False
+            
+            last_active = self._member_cache.get(group_id, {}).get(qq)
+            return last_active is not None and last_active >= cutoff_ts
+        else:
+            # 通过反向索引只检查该用户出现过的群，再按目标群过滤
+            for gid in self._qq_to_groups.get(qq, ()):
+                if targets and gid not in targets:
+                    continue
+                last_active = self._member_cache.get(gid, {}).get(qq)
+                if last_active is not None and last_active >= cutoff_ts:
+                    return True
+            return False
     
     def get_member_count(self, group_id: Optional[str] = None) -> int:
         """获取成员数量（线程安全）"""
@@ -318,11 +508,8 @@ class GroupMemberManager:
             if group_id:
                 return len(self._member_cache.get(group_id, {}))
             else:
-                # 去重统计
-                all_members = set()
-                for members in self._member_cache.values():
-                    all_members.update(members.keys())
-                return len(all_members)
+                # 去重统计：反向索引的键即为所有群的成员并集，O(1)
+                return len(self._qq_to_groups)
     
     def get_cache_status(self) -> str:
         """获取缓存状态信息（线程安全）"""
@@ -337,19 +524,19 @@ class GroupMemberManager:
             lines.append(f"\n累计收集: {self._stats.get('total_collected', 0)} 次")
             last_time = self._stats.get("last_collect_time")
             if last_time:
-                lines.append(f"最后更新: {last_time[:16]}")
+                lines.append(f"最后更新: {_format_ts(last_time)}")
             
             last_cleanup = self._stats.get("last_cleanup_time")
             if last_cleanup:
-                lines.append(f"最后清理: {last_cleanup[:16]}")
+                lines.append(f"最后清理: {_format_ts(last_cleanup)}")
             
             return "\n".join(lines)
     
     def force_update(self, group_id: Optional[str] = None):
         """强制更新（保存缓存并清理过期）"""
-        with self._lock:
+        with self._locked_all():
             self._cleanup_expired_members()
-            self._save_cache()
+        self._save_cache()
         return "✅ 缓存已保存并清理过期成员"
 
 
@@ -375,19 +562,21 @@ class GroupVerifier:
         Returns:
             (通过, 验证方式, 群号)
         """
+        # 配置快照随配置变更整体重建，这里每次只做属性读取
+        settings = self.config.settings
+        
         # 跳过验证
-        if self.config.get("skip_group_check", False):
+        if settings.skip_group_check:
             return True, "跳过验证", None
         
-        target_groups = self.config.get_target_groups()
-        if not target_groups:
+        if not settings.target_groups_set:
             return True, "无目标群", None
         
         # 方式1: 尝试从事件获取临时会话来源（最准确）
         if event:
             source_group = self._get_temp_session_source(event)
             if source_group:
-                if source_group in target_groups:
+                if source_group in settings.target_groups_set:
                     # 记录该用户（更新活跃时间）
                     self.member_manager.record_member(source_group, qq)
                     return True, "临时会话", source_group
@@ -407,47 +596,32 @@ class GroupVerifier:
         尝试多种方式获取
         """
         try:
-            # 方式1: unified_msg_origin
-            if hasattr(event, 'unified_msg_origin'):
-                origin = event.unified_msg_origin
-                if hasattr(origin, 'group_id') and origin.group_id:
-                    return str(origin.group_id)
+            # 方式1: unified_msg_origin / message_obj 上的 group_id
+            group_id = extract_group_id(event)
+            if group_id:
+                return group_id
             
-            # 方式2: message_obj
-            if hasattr(event, 'message_obj'):
-                msg_obj = event.message_obj
-                
-                # 检查 group_id
-                if hasattr(msg_obj, 'group_id') and msg_obj.group_id:
-                    return str(msg_obj.group_id)
-                
-                # 检查 temp_source
-                if hasattr(msg_obj, 'temp_source') and msg_obj.temp_source:
-                    return str(msg_obj.temp_source)
-                
-                # 检查 sender
-                if hasattr(msg_obj, 'sender'):
-                    sender = msg_obj.sender
-                    if hasattr(sender, 'group_id') and sender.group_id:
-                        return str(sender.group_id)
+            # 方式2: message_obj 的其他字段（temp_source / sender.group_id）
+            for path in _TEMP_SOURCE_PATHS:
+                value = _resolve_attr_path(event, path)
+                if value:
+                    return str(value)
             
             # 方式3: raw_message
-            if hasattr(event, 'raw_message') and isinstance(event.raw_message, dict):
-                raw = event.raw_message
+            raw = getattr(event, 'raw_message', None)
+            if isinstance(raw, dict):
                 if 'group_id' in raw:
                     return str(raw['group_id'])
                 if 'temp_source' in raw:
                     return str(raw['temp_source'])
-                if 'sender' in raw and isinstance(raw['sender'], dict):
-                    if 'group_id' in raw['sender']:
-                        return str(raw['sender']['group_id'])
+                sender = raw.get('sender')
+                if isinstance(sender, dict) and 'group_id' in sender:
+                    return str(sender['group_id'])
             
             # 方式4: 检查 sub_type (群临时会话)
-            if hasattr(event, 'message_obj'):
-                msg_obj = event.message_obj
-                if hasattr(msg_obj, 'sub_type') and msg_obj.sub_type == 'group':
-                    if hasattr(msg_obj, 'group_id'):
-                        return str(msg_obj.group_id)
+            msg_obj = getattr(event, 'message_obj', None)
+            if getattr(msg_obj, 'sub_type', None) == 'group' and hasattr(msg_obj, 'group_id'):
+                return str(msg_obj.group_id)
                         
         except Exception as e:
             logger.debug(f"[海梦酱] 获取临时会话来源失败: {e}")
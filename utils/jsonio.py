@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""JSON 编解码模块（可选 orjson 加速，未安装时回退标准库 json）
+
+配置、数据、群成员缓存统一从这里序列化，保证两种实现的输出选项一致
+"""
+
+import json
+from collections import deque
+
+try:
+    import orjson  # 可选加速：C 实现的 JSON 编解码，直接输出 bytes
+except ImportError:
+    orjson = None
+
+
+def json_default(obj):
+    """序列化兜底：set 转为有序 list（保存结果稳定，便于对比），deque 转为 list"""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    if isinstance(obj, deque):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_loads(data):
+    """解析 JSON 字节/字符串（优先 orjson）"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_dumps_bytes(obj, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 JSON 字节（优先 orjson）
+
+    Args:
+        obj: 待序列化对象（非字符串键按 str 输出，set/deque 见 json_default）
+        indent: 是否两空格缩进（持久化文件用；WAL/日志行用紧凑格式）
+    """
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option, default=json_default)
+    return json.dumps(
+        obj, indent=2 if indent else None, ensure_ascii=False, default=json_default
+    ).encode('utf-8')
+
+
+def json_dumps_str(obj) -> str:
+    """序列化为紧凑 JSON 字符串（优先 orjson）"""
+    return json_dumps_bytes(obj).decode('utf-8')
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""读写锁模块（写者优先，不可重入）"""
+
+import threading
+
+
+class _ReadSide:
+    """读锁上下文（多个读者可并发持有）"""
+
+    __slots__ = ("_rw",)
+
+    def __init__(self, rw: "ReadWriteLock"):
+        self._rw = rw
+
+    def __enter__(self):
+        self._rw.acquire_read()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._rw.release_read()
+        return False
+
+
+class _WriteSide:
+    """写锁上下文（独占）"""
+
+    __slots__ = ("_rw",)
+
+    def __init__(self, rw: "ReadWriteLock"):
+        self._rw = rw
+
+    def __enter__(self):
+        self._rw.acquire_write()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._rw.release_write()
+        return False
+
+
+class ReadWriteLock:
+    """读写锁
+
+    - 读者之间互不阻塞，写者独占
+    - 写者优先：有写者等待时新读者排队，防止写者饥饿
+    - 不可重入：持锁期间不要再次获取同一把锁（读锁嵌套在写者等待时会死锁）
+
+    用法：
+        rw = ReadWriteLock()
+        with rw.reader: ...
+        with rw.writer: ...
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0          # 当前持有读锁的读者数
+        self._writer = False       # 是否有写者持锁
+        self._writers_waiting = 0  # 等待中的写者数
+        self.reader = _ReadSide(self)
+        self.writer = _WriteSide(self)
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
@@ -1,79 +1,115 @@
 # -*- coding: utf-8 -*-
 """会话管理模块（线程安全，带容量限制）"""
 
+import heapq
 import time
 import threading
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
+try:
+    from fastrlock.rlock import FastRLock as RLock  # 可选加速：C 实现的可重入锁
+except ImportError:
+    RLock = threading.RLock
 
-# 单池最大会话数（超过时清理过期 + LRU淘汰）
-MAX_SESSIONS = 500
+
+# 最大会话数（用户与管理员合计；超过时清理过期 + LRU淘汰）
+MAX_SESSIONS = 1000
+
+
+class Session:
+    """单个会话（__slots__ 属性访问，代替每次状态切换新建的 dict）"""
+    
+    __slots__ = ("state", "context", "expire")
+    
+    def __init__(self, state: str, context: dict, expire: float):
+        self.state = state
+        self.context = context
+        self.expire = expire
 
 
 class SessionManager:
-    """会话管理器（线程安全，带容量限制）"""
+    """会话管理器（线程安全，带容量限制）
+    
+    用户与管理员会话共用一个字典，键为 (QQ号, 是否管理员)。
+    读路径不加锁：CPython 下单次 dict.get 是原子的，写者（set/clear/淘汰）
+    仍在锁内修改，读者最多看到修改前或修改后的值。
+    """
     
     def __init__(self, timeout: int = 300):
-        self._lock = threading.RLock()
-        self.user_sessions = {}    # 用户会话
-        self.admin_sessions = {}   # 管理员会话
+        self._lock = RLock()
+        self._sessions: Dict[Tuple[str, bool], Session] = {}
+        # 到期时间小顶堆 [(expire, key)]：每次 set 压入一条，过期条目由写者从堆顶分摊清理
+        # 会话被覆盖/清除后堆中旧条目成为陈旧项，弹出时比对 expire 跳过
+        self._expiry_heap: List[Tuple[float, Tuple[str, bool]]] = []
         self.timeout = timeout
     
-    def get(self, qq: str, is_admin: bool = False) -> Optional[dict]:
-        """获取会话"""
-        with self._lock:
-            sessions = self.admin_sessions if is_admin else self.user_sessions
-            
-            if qq in sessions:
-                session = sessions[qq]
-                if session.get("expire", 0) > time.time():
-                    return session
-                else:
-                    del sessions[qq]
-            
+    def get(self, qq: str, is_admin: bool = False) -> Optional[Session]:
+        """获取会话（无锁读）"""
+        key = (qq, is_admin)
+        session = self._sessions.get(key)
+        if session is None:
             return None
+        if session.expire > time.time():
+            return session
+        
+        # 已过期：加锁删除，且只删除自己看到的那个对象（避免误删刚写入的新会话）
+        with self._lock:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+        return None
+    
+    def has(self, qq: str, is_admin: bool = False) -> bool:
+        """是否存在未过期的会话（不取会话对象，供消息入口快速判断）"""
+        return self.get(qq, is_admin) is not None
     
     def set(self, qq: str, state: str, context: dict = None, is_admin: bool = False):
         """设置会话"""
+        key = (qq, is_admin)
         with self._lock:
-            sessions = self.admin_sessions if is_admin else self.user_sessions
-            sessions[qq] = {
-                "state": state,
-                "context": context or {},
-                "expire": time.time() + self.timeout
-            }
-            # 容量保护：超限时清理
-            if len(sessions) > MAX_SESSIONS:
-                self._evict(sessions)
+            now = time.time()
+            self._prune_expired(now)
+            expire = now + self.timeout
+            self._sessions[key] = Session(state, context or {}, expire)
+            heapq.heappush(self._expiry_heap, (expire, key))
+            # 容量保护：超限时淘汰
+            if len(self._sessions) > MAX_SESSIONS:
+                self._evict()
     
     def clear(self, qq: str, is_admin: bool = False):
         """清除会话"""
         with self._lock:
-            sessions = self.admin_sessions if is_admin else self.user_sessions
-            if qq in sessions:
-                del sessions[qq]
+            self._sessions.pop((qq, is_admin), None)
     
     def get_state(self, qq: str, is_admin: bool = False) -> Optional[str]:
         """获取会话状态"""
         session = self.get(qq, is_admin)
-        return session.get("state") if session else None
+        return session.state if session else None
     
     def get_context(self, qq: str, is_admin: bool = False) -> dict:
         """获取会话上下文"""
         session = self.get(qq, is_admin)
-        return session.get("context", {}) if session else {}
+        return session.context if session else {}
+    
+    def _prune_expired(self, now: float):
+        """从堆顶弹出已到期条目并删除对应会话（均摊 O(log n)，调用者已持有锁）"""
+        heap = self._expiry_heap
+        sessions = self._sessions
+        while heap and heap[0][0] <= now:
+            expire, key = heapq.heappop(heap)
+            session = sessions.get(key)
+            # expire 不一致说明会话已被刷新，是陈旧堆条目
+            if session is not None and session.expire == expire:
+                del sessions[key]
     
-    def _evict(self, sessions: dict):
-        """淘汰过期会话；若仍超限则淘汰最早过期的"""
-        now = time.time()
-        # 1. 清理所有过期会话
-        expired = [k for k, v in sessions.items() if v.get("expire", 0) <= now]
-        for k in expired:
-            del sessions[k]
+    def _evict(self):
+        """超限时淘汰最早过期的用户会话（过期会话已由 _prune_expired 清理，调用者已持有锁）
         
-        # 2. 若仍超限，按 expire 升序淘汰最旧的
-        if len(sessions) > MAX_SESSIONS:
-            sorted_keys = sorted(sessions, key=lambda k: sessions[k].get("expire", 0))
-            to_remove = len(sessions) - MAX_SESSIONS
-            for k in sorted_keys[:to_remove]:
+        按 expire 取最旧的 k 个用户会话淘汰（部分排序 O(n log k)）；
+        管理员会话不参与 LRU 淘汰，避免用户刷会话把管理员挤出操作流程
+        """
+        sessions = self._sessions
+        to_remove = len(sessions) - MAX_SESSIONS
+        if to_remove > 0:
+            user_items = ((k, v) for k, v in sessions.items() if not k[1])
+            for k, _ in heapq.nsmallest(to_remove, user_items, key=lambda item: item[1].expire):
                 del sessions[k]
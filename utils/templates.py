@@ -58,6 +58,48 @@ class Templates:
 
 ❓ 如有问题请联系久~"""
 
+    USER_MY_INFO_UNREGISTERED = """👤 【我的信息】
+
+📋 注册状态: 未注册 ❌
+
+回复 1 立即加入海梦家族~"""
+
+    USER_MY_INFO = """👤 【我的信息】
+
+📋 注册状态: 已注册 ✅
+📝 注册码: {reg_code}
+📅 注册时间: {reg_time}
+📦 导入用户: {imported}
+
+🎰 抽奖数据:
+├ 累计抽奖: {total_draws} 次
+├ 本周已抽: {week_draws}/{weekly_limit} 次
+└ 保底进度: {pity_count}/{pity_threshold}"""
+
+    USER_ANNOUNCEMENT_EMPTY = """📢 【最新公告】
+
+暂无公告~
+
+关注久获取最新消息！"""
+
+    USER_ANNOUNCEMENT = """📢 【最新公告】
+
+{content}
+
+━━━━━━━━━━━━━━━━━
+发布时间: {time}"""
+
+    USER_TIME_INFO = """📅 【发放时间】
+
+⏰ 发放时段: {time_str}
+🔄 重置时间: 每周一 00:00
+
+{countdown}
+
+💡 温馨提示:
+• 注册码随时可领（仅限一次）
+• 抽奖{limit_text}"""
+
     LOTTERY_CONFIRM = """🎰 【幸运抽奖】
 
 {pool_info}
@@ -65,6 +107,55 @@ class Templates:
 回复 GO 开始抽奖！
 回复 Q 返回菜单"""
 
+    # 抽奖结果（按档次；{icon}/{name}/{code} 通用，其余字段见各档次）
+    DRAW_RESULT_GOLD = """🎰 正在抽奖...
+
+🎊🎊🎊 超级幸运！🎊🎊🎊
+
+✨✨ 恭喜你抽中了 {icon}【{name}】！✨✨
+
+你的兑换码：
+🎁 {code}
+
+太厉害了！你是欧皇！
+累计抽奖: {total_draws} 次"""
+
+    DRAW_RESULT_PURPLE = """🎰 正在抽奖...
+
+🎉 运气不错！
+
+✨ 恭喜你抽中了 {icon}【{name}】！
+
+你的兑换码：
+🎁 {code}
+
+紫卡哦，比很多人都幸运~
+累计抽奖: {total_draws} 次"""
+
+    DRAW_RESULT_BLUE = """🎰 正在抽奖...
+
+恭喜你抽中了 {icon}【{name}】！
+
+你的兑换码：
+🎁 {code}
+
+下次说不定能抽到紫卡或金卡~
+保底进度: {pity_count}/{pity_threshold}"""
+
+    # 活动卡的 {name} 为活动名
+    DRAW_RESULT_EVENT = """🎰 正在抽奖...
+
+🎪 哇！抽中了限定活动卡！
+
+✨ 恭喜你抽中了 {icon}【{name}】！
+
+你的兑换码：
+🎁 {code}
+
+这是限定活动卡，非常珍贵！"""
+
+    DRAW_RESULT_DEFAULT = "恭喜你抽中了 {icon}【{name}】！\n兑换码: {code}"
+
     # ==================== 管理员菜单 ====================
     
     ADMIN_MENU = """🔧 【久控制面板】
@@ -186,6 +277,52 @@ EVENT002
 回复 E-2 关闭活动
 回复 E-3 查看活动卡列表"""
 
+    ADMIN_USER_MENU = """👥 【用户管理】
+
+📊 总注册: {total} 人
+🎰 累计抽奖: {week_draws} 次
+
+━━━━━━━━━━━━━━━━━
+快捷操作:
+回复 4-1 查看用户列表
+回复 4-2 QQ号 查询用户
+回复 4-3 QQ号 重置用户
+回复 4-4 QQ号 清空抽奖数据
+回复 4-5 批量导入用户
+回复 4-6 📤 导出全部用户"""
+
+    ADMIN_BLACKLIST_MENU = """🚫 【黑名单管理】
+
+当前黑名单: {count} 人
+
+{list_str}
+
+━━━━━━━━━━━━━━━━━
+快捷操作:
+回复 6-1 QQ号 添加黑名单
+回复 6-2 QQ号 移除黑名单
+回复 6-3 清空黑名单"""
+
+    ADMIN_TIME_MENU = """⏰ 【发放时间设置】
+
+当前设置: {time_str}
+
+━━━━━━━━━━━━━━━━━
+修改设置:
+回复 7-1 星期 设置星期几（如: 7-1 周日）
+回复 7-2 小时 设置几点开始（如: 7-2 9）
+回复 7-3 星期 小时 一键设置（如: 7-3 周日 9）"""
+
+    ADMIN_ANNOUNCEMENT_MENU = """📢 【公告管理】
+
+当前公告:
+{current}
+
+━━━━━━━━━━━━━━━━━
+快捷操作:
+回复 8-1 设置新公告
+回复 8-2 清空公告"""
+
     ADMIN_HELP = """📚 【久命令帮助】
 
 ━━━ 快捷命令 ━━━